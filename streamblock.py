@@ -1,18 +1,61 @@
 import tkinter as tk
-from tkinter import colorchooser, messagebox
+from tkinter import colorchooser, messagebox, simpledialog
+import argparse
+from array import array
+import importlib
+import itertools
 import json
 import os
-from PIL import Image, ImageTk, ImageFilter, ImageGrab, ImageDraw
-import ctypes
-import win32gui, win32api
+import queue
+import re
+import socket
+import socketserver
+import struct
+import sys
+from collections import deque
 import threading
 import time
-import colorsys
-import random
-import math
 from threading import Lock, Event
 
 
+class LazyModule:
+    """Module placeholder that imports on first attribute access.
+
+    The real module then replaces the placeholder in this file's globals, so
+    only the first access pays for the lookup. Keeps startup from loading
+    imaging/capture code that static blocks never use.
+    """
+    
+    def __init__(self, name, alias=None):
+        self._name = name
+        self._alias = alias or name.rpartition('.')[2]
+
+    def __getattr__(self, attr):
+        module = importlib.import_module(self._name)
+        globals()[self._alias] = module
+        return getattr(module, attr)
+
+Image = LazyModule("PIL.Image")
+ImageTk = LazyModule("PIL.ImageTk")
+ImageFilter = LazyModule("PIL.ImageFilter")
+ImageGrab = LazyModule("PIL.ImageGrab")
+ImageDraw = LazyModule("PIL.ImageDraw")
+ImageChops = LazyModule("PIL.ImageChops")
+futures = LazyModule("concurrent.futures")
+tempfile = LazyModule("tempfile")
+subprocess = LazyModule("subprocess")
+ctypes = LazyModule("ctypes")
+random = LazyModule("random")
+math = LazyModule("math")
+secrets = LazyModule("secrets")
+tracemalloc = LazyModule("tracemalloc")
+
+# Windows-only, only ever touched behind IS_WINDOWS checks
+win32gui = LazyModule("win32gui")
+win32api = LazyModule("win32api")
+win32ui = LazyModule("win32ui")
+
+
 # github.com/mirbyte
 
 
@@ -28,33 +71,820 @@ class Config:
     GRADIENT_THRESHOLD = 60
     SAMPLE_SIZE = 12
     SAMPLE_MARGIN = 12
+    DETECTION_UNION_MIN_POINTS = 32  # from this many sample points one capture covers them all
+    
+    # Pixelate/blur effect blocks
+    EFFECTS = ("pixelate", "blur")
+    EFFECT_FPS = 20  # target refresh rate per block
+    EFFECT_FRAME_BUDGET_MS = 8  # capture + filter time allowed per refresh
+    EFFECT_PIXEL_SIZE = 12  # pixelate cell size in screen pixels
+    EFFECT_BLUR_DOWNSCALE = 4  # blur works on a 1/N resolution capture
+    EFFECT_MAX_BLUR_DOWNSCALE = 12  # blur may trade resolution for budget up to here
+    EFFECT_BLUR_RADIUS = 2  # gaussian radius on the downscaled image
+    EFFECT_TILE_SIZE = 64  # screen pixels per independently refreshed tile
+    EFFECT_MIN_FPS = 15  # --benchmark-effects fails below this refresh rate per block
+    
+    # Region tracking
+    TRACK_INTERVAL = 0.1  # seconds between searches
+    TRACK_SEARCH_RADIUS = 48  # screen pixels searched around the last position
+    TRACK_DOWNSCALE = 2  # captures are matched at 1/N resolution
+    TRACK_PYRAMID_LEVELS = 3  # coarse-to-fine levels below the downscaled capture
+    TRACK_MATCH_THRESHOLD = 18  # max mean gray-level difference for a match
+    TRACK_MAX_LOST_RATE = 0.05  # max fraction of benchmark ticks without a confident match
+    
+    # Automatic suspend/resume
+    IDLE_SUSPEND_AFTER = 30.0  # seconds without any pixel change before a block idles
+    IDLE_PROBE_INTERVAL = 5.0  # detection and tracking interval while idle
+    EFFECT_IDLE_PROBE_INTERVAL = 1.0  # effect refresh interval while idle
+    ACTIVITY_POLL_MS = 1000  # how often offscreen/locked state is checked
+    PAUSE_HOTKEY = "Ctrl+Alt+P"  # global pause toggle (Windows), in-app elsewhere
+    
+    # Spatial index
+    SPATIAL_CELL_SIZE = 128  # grid cell size in screen pixels
+    SNAP_DISTANCE = 8  # dragged blocks snap to neighbor edges within this (Shift disables)
+    SAMPLE_RELOCATE_MAX = 64  # how far a covered sample point may be pushed outward
     
     # UI settings
     MIN_BLOCK_SIZE = 20
     MAX_BLOCK_WIDTH = 4000
     MAX_BLOCK_HEIGHT = 3000
     
+    # Layout loading
+    LOAD_BATCH_SIZE = 16  # blocks created per main-loop iteration
+    BLOCK_POOL_SIZE = 8  # hidden pre-built windows kept for layout switches
+    
+    # Performance profiles (see ProfileManager)
+    SETTINGS_FILE = "streamblock_settings.json"
+    PROFILE_ENV_VAR = "STREAMBLOCK_PROFILE"
+    DEFAULT_PERFORMANCE_PROFILE = "balanced"
+    SETTINGS_POLL_MS = 1000  # how often the settings file is checked for changes
+    
     # File settings
     CONFIG_FILE = "streamblock_layout.json"
+    PROFILE_FILE_PATTERN = "streamblock_layout.{}.json"
+    DEFAULT_PROFILE = "default"
+    AUTOSAVE_DELAY_MS = 1500  # debounce after the last edit
+    RECOVERY_PROFILE = "recovery"  # autosave target until a profile is loaded or saved
+    
+    # Control server (local automation)
+    IPC_HOST = "127.0.0.1"
+    IPC_PORT = 47823
+    IPC_POLL_MS = 4  # how often the main loop drains queued commands
+    IPC_TIMEOUT = 5.0  # seconds a client waits for its batch to be applied
+    IPC_TOKEN_FILE = "streamblock_ipc.token"  # clients must send this before any command
+    
+    # Event log
+    EVENT_BUFFER_SIZE = 500  # recent events kept in memory for the events view
+    EVENT_RATE_LIMIT = 5  # events per key allowed within EVENT_RATE_WINDOW
+    EVENT_RATE_WINDOW = 10.0  # seconds
+    EVENT_CONSOLE_LEVEL = "info"  # lowest level written to the console
+    EVENT_VIEW_REFRESH_MS = 500
+    
+    # Startup budgets (--benchmark-startup)
+    STARTUP_IMPORT_BUDGET_MS = 150  # importing streamblock in a fresh interpreter
+    STARTUP_WINDOW_BUDGET_MS = 1000  # process start until the control window is visible
+    
+    # Offline redaction
+    REDACT_IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff', '.webp')
+    REDACT_QUEUE_PER_WORKER = 4  # frames in flight per worker process
+
+# --- Event Log ---
+class EventLog:
+    """Leveled, rate-limited event log with a ring buffer and a background writer.
+
+    Logging only appends to memory and a queue, so it is safe to call from
+    detection/animation threads; console and file I/O happen on the writer
+    thread. Each event has a key (e.g. "detect.error"), repeats of the same
+    key beyond EVENT_RATE_LIMIT per EVENT_RATE_WINDOW are counted instead of
+    logged, and the count is reported with the next event that gets through.
+    """
+    LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40}
+    
+    def __init__(self):
+        self._lock = Lock()
+        self._buffer = deque(maxlen=Config.EVENT_BUFFER_SIZE)
+        self._rates = {}  # key -> [window_start, count, suppressed]
+        self._seq = 0
+        self._queue = queue.Queue()
+        self._writer = None
+        self.log_file = None
+        self.console_level = Config.EVENT_CONSOLE_LEVEL
+
+    def log(self, level, key, message, **fields):
+        now = time.time()
+        with self._lock:
+            rate = self._rates.get(key)
+            if rate is None or now - rate[0] >= Config.EVENT_RATE_WINDOW:
+                suppressed = rate[2] if rate else 0
+                rate = self._rates[key] = [now, 0, 0]
+            else:
+                suppressed = 0
+            if rate[1] >= Config.EVENT_RATE_LIMIT:
+                rate[2] += 1
+                return
+            rate[1] += 1
+            
+            self._seq += 1
+            event = {'seq': self._seq, 'time': now, 'level': level, 'key': key,
+                     'message': message, 'fields': fields, 'suppressed': suppressed}
+            self._buffer.append(event)
+            
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, daemon=True)
+                self._writer.start()
+        self._queue.put(event)
+
+    def debug(self, key, message, **fields):
+        self.log("debug", key, message, **fields)
+
+    def info(self, key, message, **fields):
+        self.log("info", key, message, **fields)
+
+    def warning(self, key, message, **fields):
+        self.log("warning", key, message, **fields)
+
+    def error(self, key, message, **fields):
+        self.log("error", key, message, **fields)
 
-# --- DPI Awareness ---
-try:
-    ctypes.windll.shcore.SetProcessDpiAwarenessContext(-2)
-except (AttributeError, OSError):
+    def recent(self, after_seq=0, min_level="debug"):
+        """Buffered events newer than after_seq at or above min_level"""
+        threshold = self.LEVELS.get(min_level, 0)
+        with self._lock:
+            return [event for event in self._buffer
+                    if event['seq'] > after_seq and self.LEVELS[event['level']] >= threshold]
+
+    def clear(self):
+        with self._lock:
+            self._buffer.clear()
+
+    @staticmethod
+    def format(event):
+        text = event['message']
+        if event['suppressed']:
+            text += f" ({event['suppressed']} similar suppressed)"
+        return text
+
+    def _write_loop(self):
+        while True:
+            event = self._queue.get()
+            try:
+                if self.LEVELS[event['level']] >= self.LEVELS.get(self.console_level, 20):
+                    # Looked up per event so stdout redirection in main() applies
+                    print(self.format(event), file=sys.stdout if event['level'] in ("debug", "info") else sys.stderr)
+                if self.log_file:
+                    with open(self.log_file, 'a', encoding='utf-8') as f:
+                        f.write(json.dumps(event, default=str) + "\n")
+            except Exception:
+                pass
+            finally:
+                self._queue.task_done()
+
+    def flush(self, timeout=2.0):
+        """Wait (bounded) for the writer to catch up, used before exiting"""
+        deadline = time.time() + timeout
+        while self._queue.unfinished_tasks and time.time() < deadline:
+            time.sleep(0.01)
+
+events = EventLog()
+
+# --- Platform ---
+#
+# Windows goes through pywin32/ctypes. Elsewhere (X11) Tk coordinates are
+# already physical pixels, so there is no DPI awareness to enable and screen
+# metrics come from Tk, cached on the main thread for the block threads.
+IS_WINDOWS = sys.platform == "win32"
+
+_screen_metrics = {'size': (1920, 1080), 'virtual': (0, 0, 1920, 1080), 'dpi_scale': 1.0}
+_imaging_loaded = Event()
+
+def enable_dpi_awareness():
+    """Per-monitor DPI awareness on Windows, must run before the first window is created"""
+    if not IS_WINDOWS:
+        return
     try:
-        ctypes.windll.shcore.SetProcessDpiAwareness(1)
+        ctypes.windll.shcore.SetProcessDpiAwarenessContext(-2)
     except (AttributeError, OSError):
         try:
-            ctypes.windll.user32.SetProcessDPIAware()
+            ctypes.windll.shcore.SetProcessDpiAwareness(1)
         except (AttributeError, OSError):
-            pass
+            try:
+                ctypes.windll.user32.SetProcessDPIAware()
+            except (AttributeError, OSError):
+                pass
+
+def update_screen_metrics(root):
+    """Refresh the cached screen size, virtual screen and DPI scale (main thread only)"""
+    try:
+        if IS_WINDOWS:
+            try:
+                dpi = ctypes.windll.user32.GetDpiForSystem()
+            except (AttributeError, OSError):
+                dpi = 96
+        else:
+            dpi = root.winfo_fpixels('1i')
+            sw, sh = root.winfo_screenwidth(), root.winfo_screenheight()
+            _screen_metrics['size'] = (sw, sh)
+            # One X screen spans all monitors
+            _screen_metrics['virtual'] = (0, 0, sw, sh)
+        _screen_metrics['dpi_scale'] = max(1.0, dpi / 96.0)
+    except (tk.TclError, ValueError):
+        pass
+
+def get_dpi_scale():
+    return _screen_metrics['dpi_scale']
 
 def get_screen_size():
     """Get screen dimensions with fallback"""
+    if IS_WINDOWS:
+        try:
+            return win32api.GetSystemMetrics(0), win32api.GetSystemMetrics(1)
+        except Exception:
+            return 1920, 1080
+    return _screen_metrics['size']
+
+def get_virtual_screen_rect():
+    """Bounding box (x1, y1, x2, y2) of all monitors, primary screen as fallback"""
+    if not IS_WINDOWS:
+        return _screen_metrics['virtual']
+    try:
+        x, y = win32api.GetSystemMetrics(76), win32api.GetSystemMetrics(77)
+        w, h = win32api.GetSystemMetrics(78), win32api.GetSystemMetrics(79)
+        if w > 0 and h > 0:
+            return x, y, x + w, y + h
+    except Exception:
+        pass
+    sw, sh = get_screen_size()
+    return 0, 0, sw, sh
+
+def supports_capture_behind():
+    """True where blocks can see the windows behind them without leaving the capture"""
+    return IS_WINDOWS
+
+def _is_cloaked(hwnd):
+    """DWM-cloaked windows (other virtual desktops, suspended apps) report visible but aren't shown"""
+    cloaked = ctypes.c_int(0)
+    try:
+        ctypes.windll.dwmapi.DwmGetWindowAttribute(ctypes.c_void_p(hwnd), 14, ctypes.byref(cloaked),
+                                                   ctypes.sizeof(cloaked))
+    except (AttributeError, OSError):
+        return False
+    return bool(cloaked.value)
+
+def _window_pid(hwnd):
+    pid = ctypes.c_ulong(0)
+    ctypes.windll.user32.GetWindowThreadProcessId(ctypes.c_void_p(hwnd), ctypes.byref(pid))
+    return pid.value
+
+class BehindCapture:
+    """Captures of screen regions as they look without this app's windows (Windows only).
+    
+    Walks the top-level windows front to back, collecting the other
+    processes' visible windows that overlap the region. A window is skipped
+    when a higher one already covers its part of the region, and the walk
+    stops at the first window covering all of it. Each window is rendered
+    with PrintWindow into a bitmap kept across frames, and only its visible
+    part is blitted into a region-sized canvas, so just the region's pixels
+    are copied out. The blocks stay on screen and in every other capture.
+    
+    PrintWindow always renders whole windows: the cost grows with the size
+    of the windows behind the region, not with the region. Keep one
+    instance per thread and close() it when done.
+    """
+    
+    def __init__(self):
+        self._memory = None  # DC that PrintWindow renders into
+        self._canvas = None  # DC holding the composited region
+        self._placeholder = None  # selected while bitmaps are deleted
+        self._canvas_bitmap = None
+        self._canvas_size = None
+        self._bitmaps = {}  # hwnd -> (size, bitmap) of the last grab's windows
+
+    @staticmethod
+    def layers(bbox):
+        """(hwnd, window rect) of the foreign windows showing through bbox, front to back"""
+        x1, y1, x2, y2 = bbox
+        own_pid = os.getpid()
+        layers = []
+        hwnd = win32gui.GetTopWindow(0)
+        while hwnd:
+            if win32gui.IsWindowVisible(hwnd) and not win32gui.IsIconic(hwnd) and _window_pid(hwnd) != own_pid \
+                    and not _is_cloaked(hwnd):
+                rect = win32gui.GetWindowRect(hwnd)
+                visible = (max(x1, rect[0]), max(y1, rect[1]), min(x2, rect[2]), min(y2, rect[3]))
+                if visible[0] < visible[2] and visible[1] < visible[3] and not any(
+                        r[0] <= visible[0] and r[1] <= visible[1] and r[2] >= visible[2] and r[3] >= visible[3]
+                        for _, r in layers):
+                    layers.append((hwnd, rect))
+                    if visible == (x1, y1, x2, y2):
+                        break
+            hwnd = win32gui.GetWindow(hwnd, 2)  # GW_HWNDNEXT
+        return layers
+
+    def _delete(self, bitmap):
+        self._memory.SelectObject(self._placeholder)
+        win32gui.DeleteObject(bitmap.GetHandle())
+
+    def grab(self, bbox):
+        """RGB image of bbox without this app's windows, None when unsupported"""
+        if not IS_WINDOWS:
+            return None
+        x1, y1, x2, y2 = bbox
+        w, h = x2 - x1, y2 - y1
+        layers = self.layers(bbox)
+        
+        # Bitmaps are only (re)allocated for new or resized windows
+        bitmaps = {}
+        screen_dc = win32gui.GetDC(0)
+        try:
+            screen = win32ui.CreateDCFromHandle(screen_dc)
+            if self._memory is None:
+                self._memory = screen.CreateCompatibleDC()
+                self._canvas = screen.CreateCompatibleDC()
+                self._placeholder = win32ui.CreateBitmap()
+                self._placeholder.CreateCompatibleBitmap(screen, 1, 1)
+            if self._canvas_size != (w, h):
+                bitmap = win32ui.CreateBitmap()
+                bitmap.CreateCompatibleBitmap(screen, w, h)
+                self._canvas.SelectObject(bitmap)
+                if self._canvas_bitmap is not None:
+                    win32gui.DeleteObject(self._canvas_bitmap.GetHandle())
+                self._canvas_bitmap, self._canvas_size = bitmap, (w, h)
+            
+            for hwnd, (left, top, right, bottom) in layers:
+                size = (right - left, bottom - top)
+                cached = self._bitmaps.pop(hwnd, None)
+                if cached is not None and cached[0] != size:
+                    self._delete(cached[1])
+                    cached = None
+                if cached is None:
+                    bitmap = win32ui.CreateBitmap()
+                    bitmap.CreateCompatibleBitmap(screen, *size)
+                    cached = (size, bitmap)
+                bitmaps[hwnd] = cached
+        finally:
+            win32gui.ReleaseDC(0, screen_dc)
+        
+        for _, bitmap in self._bitmaps.values():
+            self._delete(bitmap)
+        self._bitmaps = bitmaps
+        
+        self._canvas.FillSolidRect((0, 0, w, h), 0)
+        for hwnd, (left, top, right, bottom) in reversed(layers):
+            self._memory.SelectObject(bitmaps[hwnd][1])
+            try:
+                # PW_RENDERFULLCONTENT also renders DirectComposition/GPU content
+                if not ctypes.windll.user32.PrintWindow(ctypes.c_void_p(hwnd),
+                                                        ctypes.c_void_p(self._memory.GetSafeHdc()), 2):
+                    continue
+            except Exception:
+                continue  # closed or hung meanwhile, the layers below show through
+            vx1, vy1 = max(x1, left), max(y1, top)
+            vx2, vy2 = min(x2, right), min(y2, bottom)
+            self._canvas.BitBlt((vx1 - x1, vy1 - y1), (vx2 - vx1, vy2 - vy1), self._memory,
+                                (vx1 - left, vy1 - top), 0x00CC0020)  # SRCCOPY
+        self._memory.SelectObject(self._placeholder)
+        
+        return Image.frombuffer('RGB', (w, h), self._canvas_bitmap.GetBitmapBits(True), 'raw', 'BGRX', 0, 1)
+
+    def close(self):
+        """Release every GDI object"""
+        if self._memory is None:
+            return
+        for _, bitmap in self._bitmaps.values():
+            self._delete(bitmap)
+        self._bitmaps = {}
+        self._canvas.SelectObject(self._placeholder)
+        if self._canvas_bitmap is not None:
+            win32gui.DeleteObject(self._canvas_bitmap.GetHandle())
+        self._memory.DeleteDC()
+        self._canvas.DeleteDC()
+        win32gui.DeleteObject(self._placeholder.GetHandle())
+        self._memory = self._canvas = self._placeholder = self._canvas_bitmap = self._canvas_size = None
+
+def capture_behind(bbox):
+    """One-off BehindCapture grab of bbox (Windows only), None when unsupported"""
+    if not IS_WINDOWS:
+        return None
+    capture = BehindCapture()
+    try:
+        return capture.grab(bbox)
+    finally:
+        capture.close()
+
+def is_session_locked():
+    """True while the Windows session is locked (the input desktop can't be opened)"""
+    if not IS_WINDOWS:
+        return False
+    try:
+        desktop = ctypes.windll.user32.OpenInputDesktop(0, False, 0x0100)
+    except (AttributeError, OSError):
+        return False
+    if not desktop:
+        return True
+    ctypes.windll.user32.CloseDesktop(desktop)
+    return False
+
+def preload_imaging():
+    """Import the capture/imaging modules in the background once the first adaptive block starts"""
+    if _imaging_loaded.is_set():
+        return
+    _imaging_loaded.set()
+    
+    def load():
+        for name in ("PIL.Image", "PIL.ImageTk", "PIL.ImageGrab", "PIL.ImageFilter", "PIL.ImageChops"):
+            importlib.import_module(name)
+    
+    threading.Thread(target=load, daemon=True).start()
+
+class GlobalHotkey:
+    """System-wide hotkey via RegisterHotKey, running its own message loop (Windows only)"""
+    MOD_ALT = 0x0001
+    MOD_CONTROL = 0x0002
+    MOD_SHIFT = 0x0004
+    MOD_NOREPEAT = 0x4000
+    WM_HOTKEY = 0x0312
+    WM_QUIT = 0x0012
+    
+    def __init__(self, spec, callback):
+        self.spec = spec
+        self.callback = callback
+        self._thread = None
+        self._thread_id = None
+        self._registered = Event()
+
+    def _parse(self):
+        modifiers = self.MOD_NOREPEAT
+        key = None
+        for part in self.spec.split("+"):
+            part = part.strip().lower()
+            if part in ("ctrl", "control"):
+                modifiers |= self.MOD_CONTROL
+            elif part == "alt":
+                modifiers |= self.MOD_ALT
+            elif part == "shift":
+                modifiers |= self.MOD_SHIFT
+            elif len(part) == 1:
+                key = ord(part.upper())
+        return modifiers, key
+
+    def start(self):
+        """Returns True if the hotkey was registered"""
+        if not IS_WINDOWS:
+            return False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._registered.wait(1.0)
+        return self._thread_id is not None
+
+    def _run(self):
+        from ctypes import wintypes
+        user32 = ctypes.windll.user32
+        modifiers, key = self._parse()
+        
+        if key is None or not user32.RegisterHotKey(None, 1, modifiers, key):
+            self._registered.set()
+            return
+        
+        self._thread_id = ctypes.windll.kernel32.GetCurrentThreadId()
+        self._registered.set()
+        
+        msg = wintypes.MSG()
+        while user32.GetMessageW(ctypes.byref(msg), None, 0, 0) > 0:
+            if msg.message == self.WM_HOTKEY:
+                self.callback()
+        user32.UnregisterHotKey(None, 1)
+
+    def stop(self):
+        if self._thread_id is not None:
+            ctypes.windll.user32.PostThreadMessageW(self._thread_id, self.WM_QUIT, 0, 0)
+            self._thread_id = None
+
+def profile_path(name):
+    """Layout file for a named profile (the default profile keeps CONFIG_FILE)"""
+    if not name or name == Config.DEFAULT_PROFILE:
+        return Config.CONFIG_FILE
+    return Config.PROFILE_FILE_PATTERN.format(name)
+
+def list_profiles():
+    """Names of all profiles with a layout file in the working directory"""
+    profiles = [Config.DEFAULT_PROFILE]
+    prefix, suffix = Config.PROFILE_FILE_PATTERN.split("{}")
     try:
-        return win32api.GetSystemMetrics(0), win32api.GetSystemMetrics(1)
-    except:
-        return 1920, 1080
+        for filename in sorted(os.listdir(".")):
+            if filename.startswith(prefix) and filename.endswith(suffix):
+                name = filename[len(prefix):len(filename) - len(suffix)]
+                if is_valid_profile_name(name) and name not in profiles:
+                    profiles.append(name)
+    except OSError:
+        pass
+    return profiles
+
+def is_valid_profile_name(name):
+    """Profile names end up in file names, keep them simple"""
+    return bool(name) and re.fullmatch(r"[A-Za-z0-9 _-]{1,40}", name) is not None
+
+def write_text_atomic(path, text):
+    """Write text to a temp file next to path and atomically rename it over path"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix=".streamblock-", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+def clamp_block_geometry(x, y, w, h):
+    """Clamp block size to the allowed range and keep it on screen"""
+    w = max(Config.MIN_BLOCK_SIZE, min(w, Config.MAX_BLOCK_WIDTH))
+    h = max(Config.MIN_BLOCK_SIZE, min(h, Config.MAX_BLOCK_HEIGHT))
+    sw, sh = get_screen_size()
+    x = max(0, min(x, sw - w))
+    y = max(0, min(y, sh - h))
+    return x, y, w, h
+
+def parse_layout_specs(layout_data):
+    """Validate saved layout entries into (x, y, w, h, color, is_dynamic, effect) specs"""
+    if not isinstance(layout_data, list):
+        raise ValueError("Invalid layout file format")
+    
+    specs = []
+    for block_data in layout_data:
+        try:
+            if not all(key in block_data for key in ['x', 'y', 'width', 'height']):
+                events.warning("layout.invalid", f"Skipping invalid block data: {block_data}")
+                continue
+            
+            specs.append((
+                int(block_data['x']),
+                int(block_data['y']),
+                int(block_data['width']),
+                int(block_data['height']),
+                normalize_color(block_data.get('color')),
+                bool(block_data.get('is_dynamic', False)),
+                block_data.get('effect') if block_data.get('effect') in Config.EFFECTS else None
+            ))
+            
+        except (ValueError, TypeError, KeyError, AttributeError, OverflowError) as e:
+            events.warning("layout.invalid", f"Skipping invalid block: {e}")
+            continue
+    return specs
+
+def effect_downscale(effect):
+    """Capture reduction factor for an effect"""
+    return Config.EFFECT_PIXEL_SIZE if effect == "pixelate" else Config.EFFECT_BLUR_DOWNSCALE
+
+def effect_reduce(image, effect, factor):
+    """Shrink a capture by factor and apply the effect filter on the small image"""
+    factor = max(1, min(factor, image.size[0], image.size[1]))
+    small = image.reduce(factor) if factor > 1 else image
+    if effect == "blur":
+        small = small.filter(ImageFilter.GaussianBlur(Config.EFFECT_BLUR_RADIUS))
+    return small
+
+def effect_expand(small, effect, size):
+    """Scale a filtered small image back up to the block size"""
+    resample = Image.NEAREST if effect == "pixelate" else Image.BILINEAR
+    return small.resize(size, resample)
+
+class RegionTracker:
+    """Coarse-to-fine template search used by blocks that follow on-screen content.
+    
+    The template and each search capture are downscaled and turned into
+    small grayscale pyramids. All offsets are tried at the coarsest level,
+    then the best one is refined by +-1 pixel on each finer level.
+    Captures come from capture_behind, so the block never covers its target.
+    """
+    
+    def __init__(self, template, levels=None, downscale=None):
+        self.downscale = downscale or Config.TRACK_DOWNSCALE
+        self.levels = levels or Config.TRACK_PYRAMID_LEVELS
+        self.templates = self._pyramid(template.convert('L'))
+
+    def _pyramid(self, image, levels=None):
+        base = image.reduce(self.downscale) if self.downscale > 1 else image
+        pyramid = [base]
+        for _ in range(1, levels or self.levels):
+            if min(pyramid[-1].size) < 16:
+                break
+            pyramid.append(pyramid[-1].reduce(2))
+        return pyramid
+
+    def locate(self, search, start):
+        """Find the template inside a search capture.
+        
+        start is the template's last top-left position in search coordinates.
+        Returns the new top-left position, or None when nothing matches
+        confidently.
+        """
+        levels = len(self.templates)
+        images = self._pyramid(search.convert('L'), levels)
+        
+        levels = min(levels, len(images))
+        top = levels - 1
+        scale = self.downscale * 2 ** top
+        start_x, start_y = start[0] / scale, start[1] / scale
+        
+        tw, th = self.templates[top].size
+        iw, ih = images[top].size
+        candidates = [(cx, cy) for cy in range(0, ih - th + 1) for cx in range(0, iw - tw + 1)]
+        best = self._best(top, images, candidates, start_x, start_y)
+        
+        for level in range(top - 1, -1, -1):
+            if best is None:
+                return None
+            bx, by = best[0] * 2, best[1] * 2
+            tw, th = self.templates[level].size
+            iw, ih = images[level].size
+            candidates = [(bx + dx, by + dy) for dy in (-1, 0, 1) for dx in (-1, 0, 1)
+                          if 0 <= bx + dx <= iw - tw and 0 <= by + dy <= ih - th]
+            level_scale = self.downscale * 2 ** level
+            best = self._best(level, images, candidates, start[0] / level_scale, start[1] / level_scale)
+        
+        if best is None or best[2] > Config.TRACK_MATCH_THRESHOLD:
+            return None
+        return best[0] * self.downscale, best[1] * self.downscale
+
+    def _best(self, level, images, candidates, start_x, start_y):
+        template = self.templates[level]
+        tw, th = template.size
+        best = None
+        
+        for cx, cy in candidates:
+            box = (cx, cy, cx + tw, cy + th)
+            diff = ImageChops.difference(images[level].crop(box), template)
+            
+            # A 1x1 box resize is a much cheaper mean than ImageStat
+            score = diff.resize((1, 1), Image.BOX).getpixel((0, 0))
+            
+            # Prefer small moves when content is ambiguous
+            rank = score + 0.05 * (abs(cx - start_x) + abs(cy - start_y))
+            if best is None or rank < best[3]:
+                best = (cx, cy, score, rank)
+        return best
+
+# Settings that profiles may change at runtime. Everything that uses them
+# reads Config on each tick, so running blocks pick up new values.
+TUNABLE_SETTINGS = {
+    'DETECTION_INTERVAL': (float, 0.1),
+    'ANIMATION_FPS': (int, 1),
+    'TRANSITION_DURATION': (float, 0.05),
+    'COLOR_CHANGE_THRESHOLD': (int, 0),
+    'GRADIENT_THRESHOLD': (int, 0),
+    'SAMPLE_SIZE': (int, 8),
+    'EFFECT_FPS': (int, 1),
+    'EFFECT_FRAME_BUDGET_MS': (float, 1.0),
+    'TRACK_INTERVAL': (float, 0.02),
+    'IDLE_SUSPEND_AFTER': (float, 1.0),
+    'IDLE_PROBE_INTERVAL': (float, 0.1),
+    'EFFECT_IDLE_PROBE_INTERVAL': (float, 0.05),
+}
+
+# Built-in profiles, as overrides of the Config defaults ("balanced")
+PERFORMANCE_PROFILES = {
+    "eco": {
+        'DETECTION_INTERVAL': 5.0,
+        'ANIMATION_FPS': 15,
+        'TRANSITION_DURATION': 1.5,
+        'COLOR_CHANGE_THRESHOLD': 45,
+        'EFFECT_FPS': 8,
+        'EFFECT_FRAME_BUDGET_MS': 4.0,
+        'TRACK_INTERVAL': 0.25,
+        'IDLE_SUSPEND_AFTER': 10.0,
+        'IDLE_PROBE_INTERVAL': 10.0,
+        'EFFECT_IDLE_PROBE_INTERVAL': 2.0,
+    },
+    "balanced": {},
+    "realtime": {
+        'DETECTION_INTERVAL': 0.5,
+        'ANIMATION_FPS': 60,
+        'TRANSITION_DURATION': 0.4,
+        'COLOR_CHANGE_THRESHOLD': 20,
+        'EFFECT_FPS': 30,
+        'EFFECT_FRAME_BUDGET_MS': 12.0,
+        'TRACK_INTERVAL': 0.05,
+    },
+}
+
+class ProfileManager:
+    """Applies named performance profiles to Config and hot-reloads the settings file.
+    
+    The settings file is optional JSON like
+    {"profile": "eco", "profiles": {"eco": {"DETECTION_INTERVAL": 8}, "custom": {...}}}.
+    File entries override or extend the built-in profiles. The active profile
+    comes from the CLI, then the STREAMBLOCK_PROFILE environment variable,
+    then the file, then DEFAULT_PERFORMANCE_PROFILE. A choice made in the UI
+    replaces the CLI and environment picks for the rest of the session.
+    """
+    
+    def __init__(self, settings_file=None, cli_profile=None):
+        self.settings_file = settings_file or Config.SETTINGS_FILE
+        self.cli_profile = cli_profile
+        self.env_profile = os.environ.get(Config.PROFILE_ENV_VAR)
+        self.defaults = {key: getattr(Config, key) for key in TUNABLE_SETTINGS}
+        self.profiles = {}
+        self.file_profile = None
+        self.active = None
+        self._mtime = None
+
+    def load(self):
+        """Read the settings file (if any) and apply the active profile.
+        
+        A file that fails to parse keeps the profiles and settings already in
+        use, only the first load falls back to the built-in profiles.
+        """
+        profiles = {name: dict(values) for name, values in PERFORMANCE_PROFILES.items()}
+        file_profile = None
+        
+        try:
+            self._mtime = os.path.getmtime(self.settings_file)
+            with open(self.settings_file, 'r') as f:
+                settings = json.load(f)
+            if not isinstance(settings, dict):
+                raise ValueError("settings must be a JSON object")
+            
+            for name, values in settings.get('profiles', {}).items():
+                if isinstance(values, dict):
+                    profiles.setdefault(name, {}).update(self._validate(values))
+            if isinstance(settings.get('profile'), str):
+                file_profile = settings['profile']
+        except FileNotFoundError:
+            self._mtime = None
+        except (OSError, ValueError, AttributeError) as e:
+            events.error("settings.error", f"Settings file error ({self.settings_file}): {e}")
+            if self.active is not None:
+                return
+        
+        self.profiles = profiles
+        self.file_profile = file_profile
+        name = self.cli_profile or self.env_profile or self.file_profile
+        self.apply(name if name in self.profiles else Config.DEFAULT_PERFORMANCE_PROFILE)
+
+    def _validate(self, values):
+        valid = {}
+        for key, value in values.items():
+            if key not in TUNABLE_SETTINGS:
+                events.warning("settings.unknown", f"Ignoring unknown setting {key}")
+                continue
+            cast, minimum = TUNABLE_SETTINGS[key]
+            try:
+                number = cast(value)
+                if not math.isfinite(number):
+                    raise ValueError("not a finite number")
+                valid[key] = max(minimum, number)
+            except (TypeError, ValueError, OverflowError):
+                events.warning("settings.invalid", f"Ignoring invalid value for {key}: {value!r}")
+        return valid
+
+    def values(self, name):
+        """Full settings of a profile"""
+        values = dict(self.defaults)
+        values.update(self.profiles.get(name, {}))
+        return values
+
+    def apply(self, name):
+        for key, value in self.values(name).items():
+            setattr(Config, key, value)
+        if name != self.active:
+            events.info("settings.profile", f"⚡ Performance profile: {name}", profile=name)
+        self.active = name
+
+    def select(self, name):
+        """Switch profile from the UI and remember it in the settings file"""
+        if name not in self.profiles:
+            return
+        self.cli_profile = None
+        self.env_profile = None
+        self.apply(name)
+        
+        try:
+            settings = {}
+            if os.path.exists(self.settings_file):
+                with open(self.settings_file, 'r') as f:
+                    settings = json.load(f)
+            settings['profile'] = name
+            write_text_atomic(self.settings_file, json.dumps(settings, indent=2))
+            self._mtime = os.path.getmtime(self.settings_file)
+            self.file_profile = name
+        except (OSError, ValueError, AttributeError) as e:
+            events.error("settings.error", f"Failed to save profile choice: {e}")
+
+    def poll(self):
+        """Reload if the settings file changed, returns True when it did"""
+        try:
+            mtime = os.path.getmtime(self.settings_file)
+        except OSError:
+            mtime = None
+        if mtime == self._mtime:
+            return False
+        self.load()
+        return True
 
 def get_contrasting_color(bg_color):
     """Get contrasting color for text visibility"""
@@ -104,6 +934,12 @@ def color_distance_fast(color1, color2):
     except (ValueError, IndexError):
         return 0
 
+def normalize_color(value, default="#000000"):
+    """value as a lowercase #rrggbb string, default if it isn't one"""
+    if isinstance(value, str) and re.fullmatch(r"#[0-9a-fA-F]{6}", value):
+        return value.lower()
+    return default
+
 def hex_to_rgb(hex_color):
     """Convert hex color to RGB tuple with validation"""
     try:
@@ -123,20 +959,163 @@ def rgb_to_hex(rgb):
     except (ValueError, TypeError, IndexError):
         return "#808080"
 
-def interpolate_color(color1, color2, factor):
-    """Smoothly interpolate between two colors (factor 0.0 to 1.0)"""
-    try:
-        factor = max(0.0, min(1.0, factor))
-        rgb1 = hex_to_rgb(color1)
-        rgb2 = hex_to_rgb(color2)
+
+def compute_sample_areas(x, y, w, h, sw, sh):
+    """The 8 sampling boxes (4 corners + 4 edges) just outside a block on an sw x sh surface"""
+    margin = Config.SAMPLE_MARGIN
+    sample_size = Config.SAMPLE_SIZE
+    
+    return {
+        'top_left': (max(0, x - margin), max(0, y - margin),
+                    max(0, x - margin + sample_size), max(0, y - margin + sample_size)),
+        'top_right': (min(sw - sample_size, x + w + margin - sample_size), max(0, y - margin),
+                     min(sw, x + w + margin), max(0, y - margin + sample_size)),
+        'bottom_left': (max(0, x - margin), min(sh - sample_size, y + h + margin - sample_size),
+                       max(0, x - margin + sample_size), min(sh, y + h + margin)),
+        'bottom_right': (min(sw - sample_size, x + w + margin - sample_size),
+                        min(sh - sample_size, y + h + margin - sample_size),
+                        min(sw, x + w + margin), min(sh, y + h + margin)),
+        'top': (max(0, x + w//2 - 6), max(0, y - margin),
+               max(0, x + w//2 + 6), max(0, y - margin + sample_size)),
+        'bottom': (max(0, x + w//2 - 6), min(sh - sample_size, y + h + margin - sample_size),
+                  max(0, x + w//2 + 6), min(sh, y + h + margin)),
+        'left': (max(0, x - margin), max(0, y + h//2 - 6),
+                max(0, x - margin + sample_size), max(0, y + h//2 + 6)),
+        'right': (min(sw - sample_size, x + w + margin - sample_size), max(0, y + h//2 - 6),
+                 min(sw, x + w + margin), max(0, y + h//2 + 6))
+    }
+
+SAMPLE_DIRECTIONS = {
+    'top_left': (-1, -1), 'top': (0, -1), 'top_right': (1, -1),
+    'left': (-1, 0), 'right': (1, 0),
+    'bottom_left': (-1, 1), 'bottom': (0, 1), 'bottom_right': (1, 1)
+}
+
+def relocate_sample_area(area, direction, index, sw, sh, exclude=None):
+    """Push a sample box outward past blocks covering it.
+    
+    Returns the moved box, or None if it is still covered, leaves the screen
+    or would move further than SAMPLE_RELOCATE_MAX.
+    """
+    dx, dy = SAMPLE_DIRECTIONS[direction]
+    x1, y1, x2, y2 = area
+    
+    # Up to 4 shifts, the last pass only checks that the final one cleared the box
+    for attempt in range(5):
+        covering = index.query((x1, y1, x2, y2), exclude=exclude)
+        if not covering:
+            break
+        if attempt == 4:
+            return None
         
-        r = int(rgb1[0] * (1 - factor) + rgb2[0] * factor)
-        g = int(rgb1[1] * (1 - factor) + rgb2[1] * factor)
-        b = int(rgb1[2] * (1 - factor) + rgb2[2] * factor)
+        # Move along whichever outward axis clears the covering blocks soonest
+        shifts = []
+        if dx:
+            edge = min(r[0] for _, r in covering) - x2 if dx < 0 else max(r[2] for _, r in covering) - x1
+            shifts.append((abs(edge), edge, 0))
+        if dy:
+            edge = min(r[1] for _, r in covering) - y2 if dy < 0 else max(r[3] for _, r in covering) - y1
+            shifts.append((abs(edge), 0, edge))
+        _, sx, sy = min(shifts)
+        x1, x2, y1, y2 = x1 + sx, x2 + sx, y1 + sy, y2 + sy
+    
+    if x1 < 0 or y1 < 0 or x2 > sw or y2 > sh:
+        return None
+    if abs(x1 - area[0]) + abs(y1 - area[1]) > Config.SAMPLE_RELOCATE_MAX:
+        return None
+    return (x1, y1, x2, y2)
+
+class SpatialGrid:
+    """Uniform grid over block rectangles for overlap, neighbor and snap queries.
+    
+    Rectangles are (x1, y1, x2, y2) screen boxes keyed by any hashable.
+    Queries only look at the grid cells a rectangle touches, so they stay
+    cheap with hundreds of blocks. Safe to use from detection threads.
+    """
+    
+    def __init__(self, cell_size=None):
+        self.cell_size = cell_size or Config.SPATIAL_CELL_SIZE
+        self._rects = {}
+        self._cells = {}
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._rects)
+
+    def _cells_for(self, rect):
+        c = self.cell_size
+        x1, y1, x2, y2 = rect
+        for cx in range(x1 // c, max(x1, x2 - 1) // c + 1):
+            for cy in range(y1 // c, max(y1, y2 - 1) // c + 1):
+                yield (cx, cy)
+
+    def _discard(self, key):
+        rect = self._rects.pop(key, None)
+        if rect is None:
+            return
+        for cell in self._cells_for(rect):
+            keys = self._cells.get(cell)
+            if keys:
+                keys.discard(key)
+                if not keys:
+                    del self._cells[cell]
+
+    def update(self, key, rect):
+        """Insert or move a rectangle"""
+        with self._lock:
+            if self._rects.get(key) == rect:
+                return
+            self._discard(key)
+            self._rects[key] = rect
+            for cell in self._cells_for(rect):
+                self._cells.setdefault(cell, set()).add(key)
+
+    def remove(self, key):
+        with self._lock:
+            self._discard(key)
+
+    def rect(self, key):
+        return self._rects.get(key)
+
+    def query(self, rect, exclude=None):
+        """All (key, rect) pairs overlapping rect"""
+        x1, y1, x2, y2 = rect
+        found = []
+        with self._lock:
+            seen = set()
+            for cell in self._cells_for(rect):
+                for key in self._cells.get(cell, ()):
+                    if key in seen or key is exclude:
+                        continue
+                    seen.add(key)
+                    r = self._rects[key]
+                    if r[0] < x2 and x1 < r[2] and r[1] < y2 and y1 < r[3]:
+                        found.append((key, r))
+        return found
+
+    def neighbors(self, key, distance):
+        """Keys whose rectangles come within distance of key's rectangle"""
+        rect = self._rects.get(key)
+        if rect is None:
+            return []
+        x1, y1, x2, y2 = rect
+        return [k for k, _ in self.query((x1 - distance, y1 - distance, x2 + distance, y2 + distance), exclude=key)]
+
+    def snap(self, rect, distance, exclude=None):
+        """Top-left position for rect with its edges snapped to nearby rectangles' edges"""
+        x1, y1, x2, y2 = rect
+        w, h = x2 - x1, y2 - y1
+        best_x = best_y = None
         
-        return rgb_to_hex((r, g, b))
-    except Exception:
-        return color1 if color1 else "#808080"
+        for _, r in self.query((x1 - distance, y1 - distance, x2 + distance, y2 + distance), exclude=exclude):
+            for candidate in (r[2], r[0] - w, r[0], r[2] - w):
+                if abs(candidate - x1) <= distance and (best_x is None or abs(candidate - x1) < abs(best_x - x1)):
+                    best_x = candidate
+            for candidate in (r[3], r[1] - h, r[1], r[3] - h):
+                if abs(candidate - y1) <= distance and (best_y is None or abs(candidate - y1) < abs(best_y - y1)):
+                    best_y = candidate
+        
+        return (x1 if best_x is None else best_x, y1 if best_y is None else best_y)
 
 def should_use_gradient(colors):
     """Determine if gradient should be used based on 8-point analysis"""
@@ -153,57 +1132,66 @@ def should_use_gradient(colors):
     except Exception:
         return False
 
+def ease_in_out(t):
+    """Smooth easing function for natural transitions"""
+    try:
+        t = max(0.0, min(1.0, t))
+        if t < 0.5:
+            return 4 * t * t * t
+        else:
+            return 1 - pow(-2 * t + 2, 3) / 2
+    except Exception:
+        return t
+
 def create_advanced_gradient(width, height, colors):
-    """Create sophisticated multi-point gradient with error handling"""
+    """Create sophisticated multi-point gradient with error handling.
+    
+    Only the top and bottom rows are interpolated in Python; the vertical
+    blend between them is done by PIL with a gradient mask.
+    """
     try:
         if width <= 0 or height <= 0:
             return Image.new('RGB', (1, 1), hex_to_rgb('#808080'))
         
-        img = Image.new('RGB', (width, height))
-        pixels = []
-        
         # Convert all colors to RGB with validation
         color_points = {}
         for direction in ['top_left', 'top', 'top_right', 'left', 'right', 'bottom_left', 'bottom', 'bottom_right']:
             color_points[direction] = hex_to_rgb(colors.get(direction, '#808080'))
         
         # Fixed division by zero issue
-        w_1 = max(1, width - 1) if width > 1 else 1
-        h_1 = max(1, height - 1) if height > 1 else 1
-        
-        for y in range(height):
-            for x in range(width):
-                # Handle single pixel case
-                if width == 1:
-                    x_norm = 0.0
-                else:
-                    x_norm = x / w_1
-                
-                if height == 1:
-                    y_norm = 0.0
-                else:
-                    y_norm = y / h_1
-                
-                # Ensure normalization is within bounds
-                x_norm = max(0.0, min(1.0, x_norm))
-                y_norm = max(0.0, min(1.0, y_norm))
-                
-                # Simplified bilinear interpolation
-                top_color = interpolate_3_points(
-                    color_points['top_left'], color_points['top'], color_points['top_right'], x_norm
-                )
-                
-                bottom_color = interpolate_3_points(
-                    color_points['bottom_left'], color_points['bottom'], color_points['bottom_right'], x_norm
-                )
-                
-                final_color = interpolate_rgb_tuple(top_color, bottom_color, y_norm)
-                pixels.append(final_color)
+        w_1 = max(1, width - 1)
+        h_1 = max(1, height - 1)
+        
+        top_row = []
+        bottom_row = []
+        for x in range(width):
+            x_norm = 0.0 if width == 1 else x / w_1
+            top_row.append(interpolate_3_points(
+                color_points['top_left'], color_points['top'], color_points['top_right'], x_norm
+            ))
+            bottom_row.append(interpolate_3_points(
+                color_points['bottom_left'], color_points['bottom'], color_points['bottom_right'], x_norm
+            ))
+        
+        top = Image.new('RGB', (width, 1))
+        top.putdata(top_row)
+        bottom = Image.new('RGB', (width, 1))
+        bottom.putdata(bottom_row)
+        
+        if height == 1:
+            return top
+        
+        # Per-row blend factor, 0 at the top edge and 255 at the bottom edge
+        mask = Image.new('L', (1, height))
+        mask.putdata([round(255 * y / h_1) for y in range(height)])
         
-        img.putdata(pixels)
-        return img
+        return Image.composite(
+            bottom.resize((width, height), Image.NEAREST),
+            top.resize((width, height), Image.NEAREST),
+            mask.resize((width, height), Image.NEAREST)
+        )
     except Exception as e:
-        print(f"Gradient creation error: {e}")
+        events.error("gradient.error", f"Gradient creation error: {e}")
         return Image.new('RGB', (max(1, width), max(1, height)), hex_to_rgb('#808080'))
 
 def interpolate_3_points(color1, color2, color3, factor):
@@ -230,405 +1218,1358 @@ def interpolate_rgb_tuple(rgb1, rgb2, factor):
     except Exception:
         return rgb1 if rgb1 else (128, 128, 128)
 
-class BlackBlock(tk.Toplevel):
-    def __init__(self, master, x, y, w, h, color="#000000", is_dynamic=False):
-        super().__init__(master)
-        
-        # Initialize critical attributes FIRST
-        self._is_destroyed = False
-        self._detection_thread = None
-        self._animation_thread = None
-        
-        # Thread safety
-        self._lock = Lock()
-        self._stop_event = Event()
-        
-        # Validate and set initial properties
-        self.base_color = color if color and color.startswith('#') else "#000000"
-        self.current_color = self.base_color
-        self.is_dynamic = is_dynamic
-        
-        # 8-point color detection system
-        self.current_colors = {
-            'top_left': '#808080', 'top': '#808080', 'top_right': '#808080',
-            'left': '#808080', 'right': '#808080',
-            'bottom_left': '#808080', 'bottom': '#808080', 'bottom_right': '#808080'
-        }
-        self.target_colors = self.current_colors.copy()
-        self.should_gradient = False
-        self.target_gradient = False
-        self.last_printed_color = ""
-        self.gradient_photo = None
-        
-        # Animation state
-        self.transition_start_time = 0
-        self.transition_duration = Config.TRANSITION_DURATION
-        self.is_transitioning = False
-        
-        # Validate dimensions and position
-        w = max(Config.MIN_BLOCK_SIZE, min(w, Config.MAX_BLOCK_WIDTH))
-        h = max(Config.MIN_BLOCK_SIZE, min(h, Config.MAX_BLOCK_HEIGHT))
-        sw, sh = get_screen_size()
-        x = max(0, min(x, sw - w))
-        y = max(0, min(y, sh - h))
-        
-        # Drag & resize state
-        self._drag_data = {"x": 0, "y": 0, "action": None}
+# --- Block model ---
+#
+# BlockStore holds the state of every block in flat arrays, one slot per
+# block, so thousands of blocks cost a few hundred bytes each and detection,
+# transitions and persistence can run over all of them at once without Tk.
+# BlackBlock windows are views of one slot each; the effect and tracking
+# threads of a block run in its BlockWorker, also without Tk. Colors are
+# packed 0xRRGGBB ints, 8 per slot in SAMPLE_DIRECTIONS order.
+
+BLOCK_DYNAMIC = 1  # adapts its colors to the surroundings
+BLOCK_ACTIVE = 2  # detection scheduled (started and not stopped)
+BLOCK_SHOULD_GRADIENT = 4  # renders a gradient once the transition ends
+BLOCK_TARGET_GRADIENT = 8  # the current targets use a gradient
+BLOCK_TRANSITIONING = 16
+BLOCK_SUSPENDED = 32  # at least one suspend reason is set
+
+SUSPEND_REASONS = ('hidden', 'offscreen', 'locked', 'paused')  # bit i of a slot's suspend mask
+BLOCK_EFFECTS = (None,) + Config.EFFECTS
+GRAY_COLORS = array('I', [0x808080] * 8)
+UNSAMPLED_COLORS = array('I', [0xFFFFFFFF] * 8)  # never equal to a real sample
+
+def color_to_int(hex_color):
+    r, g, b = hex_to_rgb(hex_color)
+    return (r << 16) | (g << 8) | b
+
+def int_to_color(value):
+    return f"#{value & 0xFFFFFF:06x}"
+
+def color_distance_int(a, b):
+    """color_distance_fast for packed colors"""
+    return (abs((a >> 16) - (b >> 16)) + abs(((a >> 8) & 0xFF) - ((b >> 8) & 0xFF)) +
+            abs((a & 0xFF) - (b & 0xFF)))
+
+def colors_to_bytes(values):
+    return b"".join(value.to_bytes(3, "big") for value in values)
+
+def colors_from_bytes(data):
+    return [int.from_bytes(data[i:i + 3], "big") for i in range(0, 24, 3)]
+
+class BlockStore:
+    """Geometry, colors, mode and transition state of all blocks in flat arrays.
+
+    Blocks are addressed by id; each owns a slot that is reused after
+    removal. Every method takes the store lock (reentrant, so callers can
+    hold it across several calls to keep them atomic). Missing ids are
+    ignored so views and the scheduler can race with removal.
+    """
+    __slots__ = ('lock', '_slot', '_ids', '_keys', '_free', '_next_id',
+                 'x', 'y', 'w', 'h', 'base', 'effect', 'flags', 'suspend',
+                 'current', 'target', 'sampled', 'transition_start', 'next_detect', 'last_change')
+    
+    def __init__(self):
+        self.lock = threading.RLock()
+        self._slot = {}  # block id -> slot
+        self._ids = array('I')  # slot -> block id, 0 when free
+        self._keys = []  # slot -> spatial index key (the view, or the id when headless)
+        self._free = []
+        self._next_id = itertools.count(1)
         
-        try:
-            # Setup window
-            self.overrideredirect(True)
-            self.attributes("-topmost", True)
-            self.config(bg=self.current_color)
-            self.geometry(f"{w}x{h}+{x}+{y}")
-            
-            self.canvas = tk.Canvas(self, width=w, height=h, highlightthickness=0, bg=self.current_color)
-            self.canvas.pack(fill=tk.BOTH, expand=True)
-            
-            self.draw_block(w, h)
+        self.x, self.y, self.w, self.h = array('i'), array('i'), array('i'), array('i')
+        self.base = array('I')  # configured color
+        self.effect = array('B')  # index into BLOCK_EFFECTS
+        self.flags = array('B')
+        self.suspend = array('B')  # SUSPEND_REASONS bits
+        self.current = array('I')  # 8 colors per slot
+        self.target = array('I')
+        self.sampled = array('I')  # last detection samples, for idle tracking
+        self.transition_start = array('d')
+        self.next_detect = array('d')
+        self.last_change = array('d')  # last time sampled pixels changed
+
+    def __len__(self):
+        return len(self._slot)
+
+    def __contains__(self, block_id):
+        return block_id in self._slot
+
+    def ids(self):
+        with self.lock:
+            return list(self._slot)
+
+    def add(self, x, y, w, h, color="#000000", is_dynamic=False, effect=None, key=None):
+        """New block, returns its id"""
+        effect = effect if effect in Config.EFFECTS else None
+        with self.lock:
+            block_id = next(self._next_id)
+            if self._free:
+                slot = self._free.pop()
+            else:
+                slot = len(self._ids)
+                for column in (self._ids, self.x, self.y, self.w, self.h, self.base, self.effect, self.flags,
+                               self.suspend, self.transition_start, self.next_detect, self.last_change):
+                    column.append(0)
+                for column in (self.current, self.target, self.sampled):
+                    column.extend(GRAY_COLORS)
+                self._keys.append(None)
             
-            # Mouse bindings
-            self.canvas.bind("<Button-1>", self.start_drag)
-            self.canvas.bind("<B1-Motion>", self.do_drag)
-            self.canvas.bind("<ButtonRelease-1>", self.stop_drag)
-            self.canvas.bind("<Button-3>", self.start_resize)
-            self.canvas.bind("<B3-Motion>", self.do_resize)
-            self.canvas.bind("<ButtonRelease-3>", self.stop_resize)
-            self.canvas.bind("<Double-Button-1>", self.delete_block)
-            self.canvas.bind("<Button-2>", self.change_color)
-            
-            # Start dynamic color if enabled
-            if self.is_dynamic:
-                self.start_dynamic_color()
-                
-        except Exception as e:
-            print(f"Block initialization error: {e}")
-            self._is_destroyed = True
-            raise
+            base = slot * 8
+            self._ids[slot] = block_id
+            self._slot[block_id] = slot
+            self._keys[slot] = block_id if key is None else key
+            self.x[slot], self.y[slot], self.w[slot], self.h[slot] = x, y, w, h
+            self.base[slot] = color_to_int(color)
+            self.effect[slot] = BLOCK_EFFECTS.index(effect)
+            self.flags[slot] = BLOCK_DYNAMIC if is_dynamic and effect is None else 0
+            self.suspend[slot] = 0
+            self.current[base:base + 8] = GRAY_COLORS
+            self.target[base:base + 8] = GRAY_COLORS
+            self.sampled[base:base + 8] = UNSAMPLED_COLORS
+            self.transition_start[slot] = 0.0
+            self.next_detect[slot] = 0.0
+            self.last_change[slot] = time.time()
+            return block_id
 
-    def start_dynamic_color(self):
-        """Start both detection and animation threads with improved safety"""
-        with self._lock:
-            if self._detection_thread and self._detection_thread.is_alive():
+    def remove(self, block_id):
+        with self.lock:
+            slot = self._slot.pop(block_id, None)
+            if slot is None:
+                return
+            self._ids[slot] = 0
+            self.flags[slot] = 0
+            self.suspend[slot] = 0
+            self._keys[slot] = None
+            self._free.append(slot)
+
+    def key(self, block_id):
+        with self.lock:
+            slot = self._slot.get(block_id)
+            return None if slot is None else self._keys[slot]
+
+    # Geometry and mode
+
+    def geometry(self, block_id):
+        with self.lock:
+            slot = self._slot.get(block_id)
+            if slot is None:
+                return None
+            return self.x[slot], self.y[slot], self.w[slot], self.h[slot]
+
+    def set_geometry(self, block_id, x, y, w, h):
+        with self.lock:
+            slot = self._slot.get(block_id)
+            if slot is not None:
+                self.x[slot], self.y[slot], self.w[slot], self.h[slot] = x, y, w, h
+
+    def set_mode(self, block_id, color, is_dynamic, effect=None):
+        """Change color and mode, static blocks drop their gradient and transition"""
+        effect = effect if effect in Config.EFFECTS else None
+        with self.lock:
+            slot = self._slot.get(block_id)
+            if slot is None:
+                return
+            self.base[slot] = color_to_int(color)
+            self.effect[slot] = BLOCK_EFFECTS.index(effect)
+            if is_dynamic and effect is None:
+                self.flags[slot] |= BLOCK_DYNAMIC
+            else:
+                self.flags[slot] &= ~(BLOCK_DYNAMIC | BLOCK_ACTIVE | BLOCK_SHOULD_GRADIENT |
+                                      BLOCK_TARGET_GRADIENT | BLOCK_TRANSITIONING) & 0xFF
+
+    def base_color(self, block_id):
+        with self.lock:
+            slot = self._slot.get(block_id)
+            return "#000000" if slot is None else int_to_color(self.base[slot])
+
+    def effect_of(self, block_id):
+        with self.lock:
+            slot = self._slot.get(block_id)
+            return None if slot is None else BLOCK_EFFECTS[self.effect[slot]]
+
+    def has_flag(self, block_id, flag):
+        with self.lock:
+            slot = self._slot.get(block_id)
+            return slot is not None and bool(self.flags[slot] & flag)
+
+    def set_flag(self, block_id, flag, on=True):
+        with self.lock:
+            slot = self._slot.get(block_id)
+            if slot is not None:
+                self.flags[slot] = (self.flags[slot] | flag) if on else (self.flags[slot] & ~flag & 0xFF)
+
+    def renders_gradient(self, block_id):
+        return self.has_flag(block_id, BLOCK_SHOULD_GRADIENT | BLOCK_TARGET_GRADIENT)
+
+    # Suspend/resume: a block only detects, animates, filters or tracks while
+    # it has no reason to suspend
+
+    def set_suspended(self, block_id, reason, suspended):
+        """Add or clear one of SUSPEND_REASONS.
+        
+        Returns True when this cleared the last reason; the block is then
+        due for detection right away.
+        """
+        bit = 1 << SUSPEND_REASONS.index(reason)
+        with self.lock:
+            slot = self._slot.get(block_id)
+            if slot is None:
+                return False
+            old = self.suspend[slot]
+            new = (old | bit) if suspended else (old & ~bit & 0xFF)
+            if new == old:
+                return False
+            self.suspend[slot] = new
+            if new:
+                self.flags[slot] |= BLOCK_SUSPENDED
+                return False
+            self.flags[slot] &= ~BLOCK_SUSPENDED & 0xFF
+            self.next_detect[slot] = 0.0
+            self.last_change[slot] = time.time()
+            return True
+
+    def is_suspended(self, block_id):
+        return self.has_flag(block_id, BLOCK_SUSPENDED)
+
+    # Persistence
+
+    def spec(self, block_id):
+        """(x, y, w, h, color, is_dynamic, effect) as saved in layouts"""
+        with self.lock:
+            slot = self._slot.get(block_id)
+            if slot is None:
+                return None
+            return (max(0, self.x[slot]), max(0, self.y[slot]),
+                    max(Config.MIN_BLOCK_SIZE, self.w[slot]), max(Config.MIN_BLOCK_SIZE, self.h[slot]),
+                    int_to_color(self.base[slot]), bool(self.flags[slot] & BLOCK_DYNAMIC),
+                    BLOCK_EFFECTS[self.effect[slot]])
+
+    def layout_data(self, block_ids):
+        """Layout file entries for the given blocks, in order"""
+        with self.lock:
+            specs = [self.spec(block_id) for block_id in block_ids]
+        return [{'x': x, 'y': y, 'width': w, 'height': h, 'color': color,
+                 'is_dynamic': is_dynamic, 'effect': effect}
+                for x, y, w, h, color, is_dynamic, effect in filter(None, specs)]
+
+    # Colors
+
+    def colors(self, block_id, which="current"):
+        """8 colors as a direction -> hex dict (which: current, target or sampled)"""
+        values = self.color_values(block_id, which)
+        return {direction: int_to_color(value) for direction, value in zip(SAMPLE_DIRECTIONS, values)}
+
+    def color_values(self, block_id, which="current"):
+        with self.lock:
+            slot = self._slot.get(block_id)
+            if slot is None:
+                return list(GRAY_COLORS)
+            return getattr(self, which)[slot * 8:slot * 8 + 8].tolist()
+
+    def set_color_values(self, block_id, current=None, target=None):
+        with self.lock:
+            slot = self._slot.get(block_id)
+            if slot is None:
                 return
+            if current is not None:
+                self.current[slot * 8:slot * 8 + 8] = array('I', current)
+            if target is not None:
+                self.target[slot * 8:slot * 8 + 8] = array('I', target)
+
+    # Detection and transitions
+
+    def activate(self, block_id, start_at):
+        """Schedule detection, the first pass runs at start_at"""
+        with self.lock:
+            slot = self._slot.get(block_id)
+            if slot is not None and self.flags[slot] & BLOCK_DYNAMIC:
+                self.flags[slot] |= BLOCK_ACTIVE
+                self.next_detect[slot] = start_at
+
+    def touch(self, block_id, now=None):
+        """Record a pixel change seen by the block"""
+        with self.lock:
+            slot = self._slot.get(block_id)
+            if slot is not None:
+                self.last_change[slot] = time.time() if now is None else now
+
+    def is_idle(self, block_id, now=None):
+        with self.lock:
+            slot = self._slot.get(block_id)
+            if slot is None:
+                return False
+            return (time.time() if now is None else now) - self.last_change[slot] > Config.IDLE_SUSPEND_AFTER
+
+    def due(self, now):
+        """Active, unsuspended blocks whose detection is due, and the time of the next one after them.
+
+        Returns ([(id, x, y, w, h, key), ...], next_time or None).
+        """
+        wanted = BLOCK_DYNAMIC | BLOCK_ACTIVE
+        mask = wanted | BLOCK_SUSPENDED
+        due = []
+        next_time = None
+        with self.lock:
+            flags, next_detect = self.flags, self.next_detect
+            for slot in range(len(flags)):
+                if flags[slot] & mask != wanted:
+                    continue
+                at = next_detect[slot]
+                if at <= now:
+                    due.append((self._ids[slot], self.x[slot], self.y[slot], self.w[slot], self.h[slot],
+                                self._keys[slot]))
+                elif next_time is None or at < next_time:
+                    next_time = at
+        return due, next_time
+
+    def decide(self, block_id, samples, now=None):
+        """Apply one detection pass and schedule the next.
+
+        samples are 8 packed colors, None keeps that direction's target.
+        Starts a transition when any direction moved past
+        COLOR_CHANGE_THRESHOLD and returns its gradient flag, None otherwise.
+        """
+        now = time.time() if now is None else now
+        with self.lock:
+            slot = self._slot.get(block_id)
+            if slot is None:
+                return None
+            base = slot * 8
+            target = self.target
+            new = [target[base + i] if value is None else value for i, value in enumerate(samples)]
             
-            self._stop_event.clear()
+            if new != self.sampled[base:base + 8].tolist():
+                self.last_change[slot] = now
+                self.sampled[base:base + 8] = array('I', new)
+            idle = now - self.last_change[slot] > Config.IDLE_SUSPEND_AFTER
+            self.next_detect[slot] = now + (Config.IDLE_PROBE_INTERVAL if idle else Config.DETECTION_INTERVAL)
             
-            # Detection thread
-            self._detection_thread = threading.Thread(target=self._color_detection_loop, daemon=True)
-            self._detection_thread.start()
+            threshold = Config.COLOR_CHANGE_THRESHOLD
+            if not any(color_distance_int(target[base + i], new[i]) > threshold for i in range(8)):
+                return None
             
-            # Animation thread
-            self._animation_thread = threading.Thread(target=self._animation_loop, daemon=True)
-            self._animation_thread.start()
+            max_diff = max(color_distance_int(new[i], new[j]) for i in range(8) for j in range(i + 1, 8))
+            gradient = max_diff > Config.GRADIENT_THRESHOLD
+            target[base:base + 8] = array('I', new)
+            self.flags[slot] = (self.flags[slot] & ~BLOCK_TARGET_GRADIENT & 0xFF) | BLOCK_TRANSITIONING | (
+                BLOCK_TARGET_GRADIENT if gradient else 0)
+            self.transition_start[slot] = now
+            return gradient
 
-    def stop_dynamic_color(self):
-        """Stop both threads safely"""
-        self._stop_event.set()
+    def step_transitions(self, now, recorder=None):
+        """Advance every running, unsuspended transition to now, returns the ids stepped.
+
+        recorder (a TraceRecorder) sees each block before and after its step.
+        """
+        stepped = []
+        with self.lock:
+            flags, start, ids = self.flags, self.transition_start, self._ids
+            for slot in range(len(flags)):
+                if flags[slot] & (BLOCK_TRANSITIONING | BLOCK_SUSPENDED) != BLOCK_TRANSITIONING:
+                    continue
+                block_id = ids[slot]
+                elapsed = now - start[slot]
+                if recorder is not None:
+                    recorder.observe(self, block_id)
+                done = self._advance_slot(slot, elapsed)
+                if recorder is not None:
+                    recorder.frame(self, block_id, elapsed, done)
+                stepped.append(block_id)
+        return stepped
+
+    def advance(self, block_id, elapsed):
+        """One animation step towards the targets, returns True when the transition finished"""
+        with self.lock:
+            slot = self._slot.get(block_id)
+            return True if slot is None else self._advance_slot(slot, elapsed)
+
+    def _advance_slot(self, slot, elapsed):
+        base = slot * 8
+        current, target = self.current, self.target
         
-        if self._detection_thread and self._detection_thread.is_alive():
-            self._detection_thread.join(timeout=1.0)
+        if elapsed >= Config.TRANSITION_DURATION:
+            current[base:base + 8] = target[base:base + 8]
+            flags = self.flags[slot] & ~(BLOCK_TRANSITIONING | BLOCK_SHOULD_GRADIENT) & 0xFF
+            if flags & BLOCK_TARGET_GRADIENT:
+                flags |= BLOCK_SHOULD_GRADIENT
+            self.flags[slot] = flags
+            return True
         
-        if self._animation_thread and self._animation_thread.is_alive():
-            self._animation_thread.join(timeout=1.0)
+        # Linear blend per channel of the packed colors
+        f = ease_in_out(elapsed / Config.TRANSITION_DURATION)
+        g = 1 - f
+        for i in range(base, base + 8):
+            a, b = current[i], target[i]
+            current[i] = ((int((a >> 16) * g + (b >> 16) * f) << 16) |
+                          (int(((a >> 8) & 0xFF) * g + ((b >> 8) & 0xFF) * f) << 8) |
+                          int((a & 0xFF) * g + (b & 0xFF) * f))
+        return False
 
-    def _color_detection_loop(self):
-        """Background thread for optimized 8-point color detection"""
-        last_detection_time = 0
-        
-        while not self._stop_event.is_set() and not self._is_destroyed:
+class BlockScheduler:
+    """Detection and transitions for every dynamic block of a store on two shared threads.
+
+    Detection gathers all due blocks per pass; with enough sample points one
+    capture of their bounding box replaces the per-point grabs. The
+    animation thread steps every running transition per frame and hands the
+    changed ids to on_frame (called from that thread). capture, screen_size
+    and index default to the screen and no spatial index; headless runs pass
+    their own.
+    """
+    
+    def __init__(self, store, capture=None, screen_size=None, index=None, on_frame=None):
+        self.store = store
+        self.capture = capture or (lambda bbox: ImageGrab.grab(bbox=bbox))
+        self.screen_size = screen_size or get_screen_size
+        self.index = index
+        self.on_frame = on_frame
+        self._stop = Event()
+        self._detect_wakeup = Event()
+        self._animate_wakeup = Event()
+        self._threads = []
+        self._last_logged = {}  # block id -> dominant color last reported
+
+    def start(self):
+        if self._threads:
+            return
+        self._stop.clear()
+        for target in (self._detection_loop, self._animation_loop):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._stop.set()
+        self.wake()
+        for thread in self._threads:
+            thread.join(timeout=1.0)
+        self._threads = []
+
+    def wake(self):
+        self._detect_wakeup.set()
+        self._animate_wakeup.set()
+
+    def _sample_points(self, due, sw, sh):
+        """Per block the 8 sample boxes, None where a direction keeps its target"""
+        index = self.index
+        relocate = index is not None and len(index) > 1
+        plan = []
+        for block_id, x, y, w, h, key in due:
+            areas = compute_sample_areas(x, y, w, h, sw, sh)
+            # One query for the whole ring, most blocks have no neighbor that close
+            covered = relocate and index.query((min(a[0] for a in areas.values()), min(a[1] for a in areas.values()),
+                                                max(a[2] for a in areas.values()), max(a[3] for a in areas.values())),
+                                               exclude=key)
+            boxes = []
+            for direction in SAMPLE_DIRECTIONS:
+                area = areas[direction]
+                # Don't sample other overlay blocks, move past them or skip
+                if covered:
+                    area = relocate_sample_area(area, direction, index, sw, sh, exclude=key)
+                # Skip tiny areas
+                if area is None or area[2] - area[0] < 8 or area[3] - area[1] < 8:
+                    boxes.append(None)
+                else:
+                    boxes.append(area)
+            plan.append((block_id, (x, y, w, h), boxes))
+        return plan
+
+    def _capture_samples(self, plan):
+        """Center pixel of every sample box (quantized like analyze_single_pixel_area)"""
+        boxes = [box for _, _, block_boxes in plan for box in block_boxes if box]
+        union = None
+        if len(boxes) >= Config.DETECTION_UNION_MIN_POINTS:
+            union = (min(b[0] for b in boxes), min(b[1] for b in boxes),
+                     max(b[2] for b in boxes), max(b[3] for b in boxes))
             try:
-                current_time = time.time()
-                
-                # Only detect if enough time has passed
-                if current_time - last_detection_time < Config.DETECTION_INTERVAL:
-                    time.sleep(0.1)
+                pixels = self.capture(union).load()
+            except Exception:
+                return [[None] * 8 for _ in plan]
+        
+        results = []
+        for _, _, block_boxes in plan:
+            samples = []
+            for box in block_boxes:
+                if box is None:
+                    samples.append(None)
                     continue
-                
-                if not self.winfo_exists():
-                    break
-                
-                # Get block position and size with error handling
+                x1, y1, x2, y2 = box
                 try:
-                    x, y = self.winfo_x(), self.winfo_y()
-                    w, h = self.winfo_width(), self.winfo_height()
-                except tk.TclError:
-                    break
-                
-                # Enhanced 8-point sampling system
-                margin = Config.SAMPLE_MARGIN
-                sample_size = Config.SAMPLE_SIZE
-                sw, sh = get_screen_size()
-                
-                # Define 8 sampling points around the block
-                sample_areas = {
-                    'top_left': (max(0, x - margin), max(0, y - margin),
-                                max(0, x - margin + sample_size), max(0, y - margin + sample_size)),
-                    'top_right': (min(sw - sample_size, x + w + margin - sample_size), max(0, y - margin),
-                                 min(sw, x + w + margin), max(0, y - margin + sample_size)),
-                    'bottom_left': (max(0, x - margin), min(sh - sample_size, y + h + margin - sample_size),
-                                   max(0, x - margin + sample_size), min(sh, y + h + margin)),
-                    'bottom_right': (min(sw - sample_size, x + w + margin - sample_size),
-                                    min(sh - sample_size, y + h + margin - sample_size),
-                                    min(sw, x + w + margin), min(sh, y + h + margin)),
-                    'top': (max(0, x + w//2 - 6), max(0, y - margin),
-                           max(0, x + w//2 + 6), max(0, y - margin + sample_size)),
-                    'bottom': (max(0, x + w//2 - 6), min(sh - sample_size, y + h + margin - sample_size),
-                              max(0, x + w//2 + 6), min(sh, y + h + margin)),
-                    'left': (max(0, x - margin), max(0, y + h//2 - 6),
-                            max(0, x - margin + sample_size), max(0, y + h//2 + 6)),
-                    'right': (min(sw - sample_size, x + w + margin - sample_size), max(0, y + h//2 - 6),
-                             min(sw, x + w + margin), max(0, y + h//2 + 6))
-                }
-                
-                new_colors = {}
-                
-                # Take screenshots for all 8 points
-                for direction, area in sample_areas.items():
-                    x1, y1, x2, y2 = area
-                    
-                    # Skip tiny areas
-                    if x2 - x1 < 8 or y2 - y1 < 8:
-                        with self._lock:
-                            new_colors[direction] = self.target_colors.get(direction, '#808080')
-                        continue
-                    
-                    try:
-                        screenshot = ImageGrab.grab(bbox=(x1, y1, x2, y2))
-                        detected_color = analyze_single_pixel_area(screenshot)
-                        new_colors[direction] = detected_color
-                    except Exception:
-                        with self._lock:
-                            new_colors[direction] = self.target_colors.get(direction, '#808080')
-                
-                # Check if colors have changed significantly (thread safety fixed)
-                colors_changed = False
-                with self._lock:
-                    for direction in self.target_colors.keys():
-                        old_color = self.target_colors.get(direction, '#808080')
-                        new_color = new_colors.get(direction, '#808080')
-                        if color_distance_fast(old_color, new_color) > Config.COLOR_CHANGE_THRESHOLD:
-                            colors_changed = True
-                            break
-                
-                if colors_changed:
-                    self.target_gradient = should_use_gradient(new_colors)
-                    mode = "gradient" if self.target_gradient else "solid"
-                    
-                    # Only print when dominant color changes
-                    dominant_color = new_colors.get('top', '#808080')
-                    if dominant_color != self.last_printed_color:
-                        print(f"🎨 Block adapting: {mode.upper()} mode → {dominant_color}")
-                        self.last_printed_color = dominant_color
-                    
-                    # Start smooth transition to new colors
-                    self.start_transition(new_colors)
-                
-                last_detection_time = current_time
-                
+                    if union:
+                        pixel = pixels[x1 + (x2 - x1) // 2 - union[0], y1 + (y2 - y1) // 2 - union[1]]
+                    else:
+                        shot = self.capture(box)
+                        pixel = shot.getpixel((shot.size[0] // 2, shot.size[1] // 2))
+                    r, g, b = pixel[:3]
+                    samples.append(((r & 0xF0) << 16) | ((g & 0xF0) << 8) | (b & 0xF0))
+                except Exception:
+                    samples.append(None)
+            results.append(samples)
+        return results
+
+    def detect_due(self, now=None):
+        """Run detection for every block that is due, returns (blocks sampled, next due time)"""
+        now = time.time() if now is None else now
+        store = self.store
+        due, next_time = store.due(now)
+        if not due:
+            return 0, next_time
+        
+        sw, sh = self.screen_size()
+        plan = self._sample_points(due, sw, sh)
+        samples = self._capture_samples(plan)
+        
+        adapted = []
+        with store.lock:
+            recorder = trace_recorder
+            for (block_id, geometry, _), block_samples in zip(plan, samples):
+                # Stopped while capturing
+                if not store.has_flag(block_id, BLOCK_ACTIVE):
+                    continue
+                if recorder is not None:
+                    recorder.observe(store, block_id)
+                gradient = store.decide(block_id, block_samples, now)
+                if recorder is not None:
+                    recorder.detection(store, block_id, geometry, gradient)
+                if gradient is not None:
+                    adapted.append((block_id, gradient, store.color_values(block_id, "target")[1]))
+        
+        if adapted:
+            self.wake()
+        for block_id, gradient, dominant in adapted:
+            # Only log when dominant color changes
+            if self._last_logged.get(block_id) != dominant:
+                self._last_logged[block_id] = dominant
+                mode = "gradient" if gradient else "solid"
+                events.info("detect.adapt", f"🎨 Block adapting: {mode.upper()} mode → {int_to_color(dominant)}",
+                            block=block_id, color=int_to_color(dominant))
+        if len(self._last_logged) > 2 * len(store):
+            self._last_logged = {k: v for k, v in self._last_logged.items() if k in store}
+        
+        # Decided blocks come back one interval from now at the earliest
+        soonest = now + min(Config.DETECTION_INTERVAL, Config.IDLE_PROBE_INTERVAL)
+        return len(plan), soonest if next_time is None else min(next_time, soonest)
+
+    def animate(self, now=None):
+        """Step every running transition once, returns the ids whose colors changed"""
+        return self.store.step_transitions(time.time() if now is None else now, trace_recorder)
+
+    def _detection_loop(self):
+        while not self._stop.is_set():
+            try:
+                _, next_time = self.detect_due()
+                wait = 1.0 if next_time is None else min(1.0, next_time - time.time())
             except Exception as e:
-                print(f"Detection error: {e}")
-                time.sleep(1.0)
+                events.error("detect.error", f"Detection error: {e}")
+                wait = 1.0
+            if wait > 0:
+                self._detect_wakeup.wait(wait)
+            self._detect_wakeup.clear()
 
     def _animation_loop(self):
-        """Background thread for smooth color transitions"""
-        while not self._stop_event.is_set() and not self._is_destroyed:
+        while not self._stop.is_set():
+            frame_start = time.perf_counter()
+            try:
+                changed = self.animate()
+                if changed and self.on_frame:
+                    self.on_frame(changed)
+            except Exception as e:
+                events.error("animation.error", f"Animation error: {e}")
+                changed = None
+                time.sleep(0.1)
+            
+            if changed:
+                time.sleep(max(0.0, 1 / Config.ANIMATION_FPS - (time.perf_counter() - frame_start)))
+            else:
+                # Sleep until a transition starts instead of ticking idle frames
+                self._animate_wakeup.wait(1.0)
+                self._animate_wakeup.clear()
+
+class BlockWorker:
+    """Effect and tracking threads of one block, independent of Tk.
+    
+    Geometry, effect and suspension come from the store. Results go back
+    through post(callback, *args), which runs callback on the UI thread:
+    on_tiles(tiles) with changed effect tiles as {origin: image} and
+    on_move(x, y) when tracking found the content elsewhere. is_dragging
+    pauses tracking while the user holds the block. capture(bbox) defaults
+    to a BehindCapture per thread; benchmarks pass their own.
+    """
+    
+    def __init__(self, store, block_id, post, on_tiles=None, on_move=None, is_dragging=None, capture=None):
+        self.store = store
+        self.block_id = block_id
+        self.post = post
+        self.capture = capture
+        self.on_tiles = on_tiles
+        self.on_move = on_move
+        self.is_dragging = is_dragging or (lambda: False)
+        self.closed = False
+        
+        # Wakes the loops on resume, stop and close
+        self._state_cond = threading.Condition()
+        self._detect_now = False
+        
+        # Effect: pending tiles are handed to the UI thread in one batch
+        self._lock = Lock()
+        self._stop_event = Event()
+        self._effect_thread = None
+        self._effect_pending = {}
+        self._effect_apply_scheduled = False
+        self.effect_full_refresh = True
+        self.frames = 0  # effect captures processed
+        
+        # Region tracking: follow the content recorded under the block
+        self.tracking = False
+        self._tracker = None
+        self._tracking_stop = Event()
+        self._tracking_thread = None
+
+    def close(self):
+        """Stop both loops for good (the view is gone)"""
+        self.closed = True
+        self.stop_tracking()
+        self.stop_effect(wait=False)
+
+    # Suspend/resume
+
+    def wake(self, refresh=False):
+        """Re-check suspension and stop now, refresh also skips the effect's wait"""
+        with self._state_cond:
+            if refresh:
+                self._detect_now = True
+            self._state_cond.notify_all()
+
+    def _wait_state(self, predicate, timeout):
+        """Sleep until predicate holds, the loops stop or timeout passes"""
+        with self._state_cond:
+            return self._state_cond.wait_for(
+                lambda: predicate() or self._stop_event.is_set() or self.closed, timeout)
+
+    def _wait_active(self, timeout=1.0):
+        return self._wait_state(lambda: not self.store.is_suspended(self.block_id), timeout)
+
+    # Pixelate/blur
+
+    def start_effect(self):
+        """Start the effect refresh thread unless it is already running"""
+        with self._lock:
+            if self._effect_thread and self._effect_thread.is_alive():
+                if not self._stop_event.is_set():
+                    return
+                self._effect_thread.join(timeout=1.0)
+            self._stop_event.clear()
+        
+        self._effect_thread = threading.Thread(target=self._effect_loop, daemon=True)
+        self._effect_thread.start()
+
+    def stop_effect(self, wait=True):
+        """Stop the effect thread (wait=False only signals it to exit)"""
+        self._stop_event.set()
+        self.wake()
+        if wait and self._effect_thread and self._effect_thread.is_alive():
+            self._effect_thread.join(timeout=1.0)
+
+    def _grabber(self):
+        """capture callable for one thread and the BehindCapture to close after it (if any)"""
+        if self.capture is not None:
+            return self.capture, None
+        behind = BehindCapture()
+        return behind.grab, behind
+
+    def _effect_loop(self):
+        grab, behind = self._grabber()
+        try:
+            self._run_effect(grab)
+        finally:
+            if behind is not None:
+                behind.close()
+
+    def _run_effect(self, grab):
+        """Background thread: capture behind the block, filter small, hand changed tiles over"""
+        store, block_id = self.store, self.block_id
+        effect = store.effect_of(block_id)
+        factor = effect_downscale(effect)
+        work_avg = 0.0
+        previous = None  # last filtered frame, kept across suspends for instant resume
+        
+        while not self._stop_event.is_set() and not self.closed:
+            if store.is_suspended(block_id):
+                self._wait_active()
+                continue
+            
+            frame_start = time.perf_counter()
             try:
-                if self.is_transitioning:
-                    current_time = time.time()
-                    elapsed = current_time - self.transition_start_time
+                geometry = store.geometry(block_id)
+                if geometry is None:
+                    break
+                x, y, w, h = geometry
+                
+                capture = grab((x, y, x + w, y + h)) if w > 1 and h > 1 else None
+                if capture is not None:
+                    self.frames += 1
+                    small = effect_reduce(capture, effect, factor)
                     
-                    if elapsed >= self.transition_duration:
-                        # Transition complete
-                        with self._lock:
-                            self.current_colors = self.target_colors.copy()
-                            self.should_gradient = self.target_gradient
-                            self.is_transitioning = False
+                    if self.effect_full_refresh or previous is None or previous.size != small.size:
+                        self.effect_full_refresh = False
+                        self._queue_effect_tiles(effect_expand(small, effect, (w, h)), None)
                     else:
-                        # Calculate transition factor
-                        factor = elapsed / self.transition_duration
-                        factor = self.ease_in_out(factor)
-                        
-                        # Interpolate all 8 colors
-                        with self._lock:
-                            for direction in self.current_colors.keys():
-                                current = self.current_colors[direction]
-                                target = self.target_colors[direction]
-                                self.current_colors[direction] = interpolate_color(current, target, factor)
-                    
-                    # Update UI
-                    if not self._stop_event.is_set():
-                        self.after_idle(self._update_animation_ui)
+                        diff = ImageChops.difference(small, previous)
+                        if diff.getbbox():
+                            store.touch(block_id)
+                            self._queue_effect_tiles(effect_expand(small, effect, (w, h)), diff)
+                    previous = small
                 
-                # 30 FPS animation
-                time.sleep(1/Config.ANIMATION_FPS)
+                # Keep capture + filter time inside the per-block budget
+                work = (time.perf_counter() - frame_start) * 1000
+                work_avg = work if work_avg == 0.0 else work_avg * 0.8 + work * 0.2
+                budget = Config.EFFECT_FRAME_BUDGET_MS
+                if effect == "blur" and work_avg > budget and factor < Config.EFFECT_MAX_BLUR_DOWNSCALE:
+                    factor += 1
+                    previous = None
                 
+                interval = 1.0 / Config.EFFECT_FPS
+                if work_avg > budget:
+                    interval *= work_avg / budget
+                if store.is_idle(block_id):
+                    interval = max(interval, Config.EFFECT_IDLE_PROBE_INTERVAL)
             except Exception as e:
-                print(f"Animation error: {e}")
-                time.sleep(0.1)
+                events.error("effect.error", f"Effect error: {e}", block=block_id)
+                interval = 1.0
+            
+            self._detect_now = False
+            self._wait_state(lambda: self._detect_now, max(0.0, interval - (time.perf_counter() - frame_start)))
 
-    def ease_in_out(self, t):
-        """Smooth easing function for natural transitions"""
-        try:
-            t = max(0.0, min(1.0, t))
-            if t < 0.5:
-                return 4 * t * t * t
+    def _queue_effect_tiles(self, image, diff):
+        """Cut the upscaled image into changed tiles and hand them to the UI thread.
+        
+        diff is the difference of the small images, None refreshes every tile.
+        """
+        w, h = image.size
+        tile = Config.EFFECT_TILE_SIZE
+        sx = diff.size[0] / w if diff else 0
+        sy = diff.size[1] / h if diff else 0
+        
+        tiles = {}
+        for ty in range(0, h, tile):
+            for tx in range(0, w, tile):
+                box = (tx, ty, min(w, tx + tile), min(h, ty + tile))
+                if diff:
+                    small_box = (int(box[0] * sx), int(box[1] * sy),
+                                 max(int(box[0] * sx) + 1, math.ceil(box[2] * sx)),
+                                 max(int(box[1] * sy) + 1, math.ceil(box[3] * sy)))
+                    if not diff.crop(small_box).getbbox():
+                        continue
+                tiles[(tx, ty)] = image.crop(box)
+        
+        if not tiles:
+            return
+        
+        with self._lock:
+            if diff is None:
+                self._effect_pending = tiles
             else:
-                return 1 - pow(-2 * t + 2, 3) / 2
+                self._effect_pending.update(tiles)
+            if self._effect_apply_scheduled:
+                return
+            self._effect_apply_scheduled = True
+        
+        try:
+            self.post(self._deliver_tiles)
         except Exception:
-            return t
+            # The UI is shutting down
+            self._effect_apply_scheduled = False
 
-    def start_transition(self, new_target_colors):
-        """Start a smooth transition to new colors"""
+    def _deliver_tiles(self):
         with self._lock:
-            self.target_colors = new_target_colors.copy()
-            self.transition_start_time = time.time()
-            self.is_transitioning = True
+            pending, self._effect_pending = self._effect_pending, {}
+            self._effect_apply_scheduled = False
+        if pending and not self.closed and self.on_tiles:
+            self.on_tiles(pending)
 
-    def _update_animation_ui(self):
-        """Update UI during animation (called from main thread)"""
+    # Region tracking
+
+    def start_tracking(self):
+        """Record what the block covers and start following it, returns False if the capture failed"""
+        self.stop_tracking()
+        geometry = self.store.geometry(self.block_id)
+        if geometry is None or self.closed:
+            return False
+        x, y, w, h = geometry
         try:
-            if self._is_destroyed:
-                return
-            
-            if not self.winfo_exists():
-                return
-            
-            # Get dimensions safely
-            try:
-                w, h = self.winfo_width(), self.winfo_height()
-            except tk.TclError:
-                return
-            
-            # Ensure minimum size
-            if w <= 0 or h <= 0:
-                return
-            
-            with self._lock:
-                if self.should_gradient or self.target_gradient:
-                    # Create advanced multi-point gradient
-                    gradient_img = create_advanced_gradient(w, h, self.current_colors)
-                    self.gradient_photo = ImageTk.PhotoImage(gradient_img)
-                else:
-                    # Only overwrite current_color if dynamic
-                    if self.is_dynamic:
-                        self.current_color = self.current_colors.get('top', '#808080')
-            
-            self.draw_block_smooth(w, h)
-            
-        except tk.TclError:
-            pass
+            template = (self.capture or capture_behind)((x, y, x + w, y + h))
         except Exception as e:
-            print(f"Animation UI error: {e}")
+            events.error("tracking.error", f"Tracking start error: {e}", block=self.block_id)
+            return False
+        if template is None:
+            return False
+        
+        self.tracking = True
+        # Fresh event per session so a previous thread can't miss its stop
+        self._tracking_stop = Event()
+        self._tracker = RegionTracker(template)
+        self._tracking_thread = threading.Thread(target=self._tracking_loop,
+                                                 args=(self._tracker, self._tracking_stop), daemon=True)
+        self._tracking_thread.start()
+        events.info("tracking.start", f"🎯 Block tracking content at ({x}, {y}) size {w}x{h}", block=self.block_id)
+        return True
 
-    def draw_block_smooth(self, w, h):
-        """Draw block with smooth transitions"""
+    def stop_tracking(self):
+        """Stop following content, returns True if the block was tracking"""
+        was_tracking = self.tracking
+        self.tracking = False
+        self._tracking_stop.set()
+        self._tracker = None
+        return was_tracking
+
+    def _tracking_loop(self, tracker, stop_event):
+        grab, behind = self._grabber()
         try:
-            if self._is_destroyed:
-                return
-            
-            self.canvas.delete("all")
+            self._run_tracking(tracker, stop_event, grab)
+        finally:
+            if behind is not None:
+                behind.close()
+
+    def _run_tracking(self, tracker, stop_event, grab):
+        """Background thread: search around the block and report the best match"""
+        store, block_id = self.store, self.block_id
+        while not stop_event.is_set() and not self.closed:
+            if store.is_suspended(block_id):
+                self._wait_active(0.5)
+                continue
             
-            if (self.should_gradient or self.target_gradient) and self.gradient_photo:
-                # Draw advanced gradient
-                self.canvas.create_image(0, 0, anchor=tk.NW, image=self.gradient_photo)
-            else:
-                # Draw solid color
-                self.canvas.create_rectangle(0, 0, w, h, fill=self.current_color, outline=self.current_color)
+            tick_start = time.perf_counter()
+            try:
+                geometry = store.geometry(block_id)
+                if geometry is None:
+                    break
+                if not self.is_dragging():
+                    x, y, w, h = geometry
+                    sw, sh = get_screen_size()
+                    r = Config.TRACK_SEARCH_RADIUS
+                    box = (max(0, x - r), max(0, y - r), min(sw, x + w + r), min(sh, y + h + r))
+                    
+                    search = grab(box)
+                    start = (x - box[0], y - box[1])
+                    
+                    match = tracker.locate(search, start)
+                    if match and match != start:
+                        store.touch(block_id)
+                        if self.on_move:
+                            self.post(self.on_move, box[0] + match[0], box[1] + match[1])
+            except Exception as e:
+                events.error("tracking.error", f"Tracking error: {e}", block=block_id)
             
-            # Minimal indicator
-            if self.is_dynamic and w > 20 and h > 20:
-                indicator_text = "D"
-                if self.should_gradient or self.target_gradient:
-                    if self.is_transitioning:
-                        indicator_text += "→"
-                
-                self.canvas.create_text(5, 5, text=indicator_text,
-                                      fill=get_contrasting_color(self.current_color),
-                                      font=("Arial", 8, "bold"), anchor="nw")
-        except tk.TclError:
-            pass
+            interval = Config.TRACK_INTERVAL
+            if store.is_idle(block_id):
+                interval = max(interval, Config.IDLE_PROBE_INTERVAL)
+            stop_event.wait(max(0.0, interval - (time.perf_counter() - tick_start)))
 
-    def draw_block(self, w, h):
-        """Regular drawing method"""
-        self.draw_block_smooth(w, h)
+class DragController:
+    """The block being moved or resized with the mouse and where the drag started.
+    
+    There is only one pointer, so the app keeps a single controller for
+    all of its blocks instead of drag state in every window.
+    """
+    
+    def __init__(self):
+        self.block = None
+        self.action = None  # "move" or "resize"
+        self.x = self.y = 0
 
-    def change_color(self, event):
-        """Change block color - simplified behavior"""
-        try:
-            if self.is_dynamic:
-                # Dynamic block - do nothing on middle click
-                return
-            else:
-                # Static block - directly open color chooser
-                color = colorchooser.askcolor(initialcolor=self.base_color)[1]
-                if color and color.startswith('#'):
-                    self.base_color = color
-                    self.current_color = color
-                    self.should_gradient = False
-                    self.is_transitioning = False
-                    self._update_animation_ui()
-        except (tk.TclError, AttributeError):
-            pass
+    def begin(self, block, action, x, y):
+        self.block, self.action, self.x, self.y = block, action, x, y
 
-    def get_block_data(self):
-        """Return block data for saving with validation"""
-        try:
-            if self._is_destroyed or not self.winfo_exists():
-                return None
-            
-            return {
-                'x': max(0, self.winfo_x()),
-                'y': max(0, self.winfo_y()),
-                'width': max(Config.MIN_BLOCK_SIZE, self.winfo_width()),
-                'height': max(Config.MIN_BLOCK_SIZE, self.winfo_height()),
-                'color': self.base_color,
-                'is_dynamic': self.is_dynamic
-            }
-        except tk.TclError:
+    def end(self, block):
+        """Finish block's drag, returns the action it was doing (None if it wasn't dragged)"""
+        if self.block is not block:
             return None
+        action = self.action
+        self.block = self.action = None
+        return action
 
-    def start_drag(self, event):
-        if not self._is_destroyed:
-            self._drag_data["x"] = event.x
-            self._drag_data["y"] = event.y
-            self._drag_data["action"] = "move"
-            try:
-                self.canvas.config(cursor="fleur")
-            except tk.TclError:
-                pass
+    def action_of(self, block):
+        return self.action if self.block is block else None
 
-    def do_drag(self, event):
-        if self._drag_data["action"] == "move" and not self._is_destroyed:
-            try:
-                dx = event.x - self._drag_data["x"]
-                dy = event.y - self._drag_data["y"]
-                sw, sh = get_screen_size()
-                new_x = max(0, min(self.winfo_x() + dx, sw - self.winfo_width()))
-                new_y = max(0, min(self.winfo_y() + dy, sh - self.winfo_height()))
-                self.geometry(f"+{new_x}+{new_y}")
-            except tk.TclError:
-                pass
+    def is_dragging(self, block):
+        return self.block is block
 
-    def stop_drag(self, event):
-        self._drag_data["action"] = None
+class BlackBlock(tk.Toplevel):
+    """Overlay window showing one block of the app's BlockStore"""
+    
+    def __init__(self, master, x, y, w, h, color="#000000", is_dynamic=False, deferred=False, effect=None):
+        super().__init__(master)
+        
+        # Deferred blocks stay unmapped until reveal() so bulk loads map together
+        if deferred:
+            self.withdraw()
+        
+        # Initialize critical attributes FIRST
+        self._is_destroyed = False
+        
+        # Validate dimensions and position
+        x, y, w, h = clamp_block_geometry(x, y, w, h)
+        color = normalize_color(color)
+        
+        # Geometry, colors, mode and transition state live in the app's block
+        # store; detection and animation run on the shared scheduler threads
+        self.store = master.block_store
+        self.scheduler = master.scheduler
+        self.block_id = self.store.add(x, y, w, h, color, is_dynamic, effect, key=self)
+        self.current_color = color
+        
+        # Effect and tracking threads work from the store and post results back
+        self.drag = master.drag
+        self.worker = BlockWorker(self.store, self.block_id, self._post, on_tiles=self._apply_effect_tiles,
+                                  on_move=self._move_tracked, is_dragging=lambda: self.drag.is_dragging(self))
+        if getattr(master, 'paused', False):
+            self.set_suspended('paused', True)
+        
+        # Canvas images of the effect tiles, keyed by tile origin
+        self._effect_tiles = {}
+        self.gradient_photo = None
+        
         try:
-            self.canvas.config(cursor="")
-        except tk.TclError:
-            pass
-
-    def start_resize(self, event):
-        if not self._is_destroyed:
-            self._drag_data["x"] = event.x
-            self._drag_data["y"] = event.y
-            self._drag_data["action"] = "resize"
+            # Setup window
+            self.overrideredirect(True)
+            self.attributes("-topmost", True)
+            self.config(bg=self.current_color)
+            self.geometry(f"{w}x{h}+{x}+{y}")
+            
+            self.canvas = tk.Canvas(self, width=w, height=h, highlightthickness=0, bg=self.current_color)
+            self.canvas.pack(fill=tk.BOTH, expand=True)
+            
+            self.draw_block(w, h)
+            
+            # Mouse bindings
+            self.canvas.bind("<Button-1>", self.start_drag)
+            self.canvas.bind("<B1-Motion>", self.do_drag)
+            self.canvas.bind("<ButtonRelease-1>", self.stop_drag)
+            self.canvas.bind("<Button-3>", self.start_resize)
+            self.canvas.bind("<B3-Motion>", self.do_resize)
+            self.canvas.bind("<ButtonRelease-3>", self.stop_resize)
+            self.canvas.bind("<Double-Button-1>", self.delete_block)
+            self.canvas.bind("<Button-2>", self.change_color)
+            self.canvas.bind("<Control-Button-1>", self.toggle_tracking)
+            
+            # Keep the app's spatial index in sync with whatever moves the window
+            self.bind("<Configure>", self._on_configure)
+            self.bind("<Map>", self._on_map)
+            self.bind("<Unmap>", self._on_unmap)
+            self.bind("<Destroy>", self._on_destroy)
+            
+            # Start dynamic color if enabled (deferred blocks start on reveal)
+            if self.is_dynamic and not deferred:
+                self.start_dynamic_color()
+            elif self.effect and not deferred:
+                self.start_effect()
+                
+        except Exception as e:
+            events.error("block.error", f"Block initialization error: {e}")
+            self._is_destroyed = True
+            self.store.remove(self.block_id)
+            try:
+                self.destroy()
+            except tk.TclError:
+                pass
+            raise
+
+    @property
+    def is_dynamic(self):
+        return self.store.has_flag(self.block_id, BLOCK_DYNAMIC)
+
+    @property
+    def effect(self):
+        return self.store.effect_of(self.block_id)
+
+    @property
+    def base_color(self):
+        return self.store.base_color(self.block_id)
+
+    @property
+    def tracking(self):
+        return self.worker.tracking
+
+    def _post(self, callback, *args):
+        """Run callback on the Tk thread (BlockWorker results)"""
+        self.after_idle(callback, *args)
+
+    def reveal(self, phase=0.0):
+        """Map a deferred block and start dynamic color with the given detection phase"""
+        try:
+            self.deiconify()
+        except tk.TclError:
+            return
+        if self.is_dynamic:
+            self.start_dynamic_color(phase)
+        elif self.effect:
+            self.start_effect()
+
+    def start_dynamic_color(self, phase=0.0):
+        """Schedule color detection for this block on the shared scheduler.
+        
+        phase delays the first detection tick (seconds) so that many blocks
+        started together don't all capture the screen at the same moment.
+        """
+        preload_imaging()
+        self.store.activate(self.block_id, time.time() + max(0.0, phase))
+        self.scheduler.wake()
+
+    def stop_dynamic_color(self, wait=True):
+        """Stop detection and the effect thread (wait=False only signals it to exit)"""
+        self.store.set_flag(self.block_id, BLOCK_ACTIVE, False)
+        self.worker.stop_effect(wait)
+
+    def start_effect(self):
+        """Start the pixelate/blur refresh thread (main thread only).
+        
+        The worker renders the windows behind the block with capture_behind,
+        so the block itself stays visible to recordings and streams. Where
+        that isn't supported the block stays an opaque base-color box.
+        """
+        if not supports_capture_behind():
+            events.warning("effect.unsupported", "⚠️ Pixelate/blur needs Windows, effect block stays opaque",
+                           block=self.block_id)
+            return
+        self.worker.start_effect()
+
+    def _apply_effect_tiles(self, tiles):
+        """Paste filtered tiles into their canvas images (main thread)"""
+        if self._is_destroyed:
+            return
+        
+        try:
+            for origin, tile_img in tiles.items():
+                existing = self._effect_tiles.get(origin)
+                if existing and existing[0].width() == tile_img.size[0] and existing[0].height() == tile_img.size[1]:
+                    existing[0].paste(tile_img)
+                else:
+                    if existing:
+                        self.canvas.delete(existing[1])
+                    photo = ImageTk.PhotoImage(tile_img)
+                    item = self.canvas.create_image(origin[0], origin[1], anchor=tk.NW, image=photo)
+                    self.canvas.tag_raise("indicator")
+                    self._effect_tiles[origin] = (photo, item)
+        except tk.TclError:
+            pass
+
+    @property
+    def block_index(self):
+        return getattr(self.master, 'block_index', None)
+
+    def _on_configure(self, event):
+        # Toplevel bindings also fire for the canvas
+        if event.widget is not self:
+            return
+        try:
+            if self._is_destroyed or not self.winfo_ismapped():
+                return
+            x, y = self.winfo_x(), self.winfo_y()
+            w, h = self.winfo_width(), self.winfo_height()
+        except tk.TclError:
+            return
+        self.store.set_geometry(self.block_id, x, y, w, h)
+        if self.block_index is not None:
+            self.block_index.update(self, (x, y, x + w, y + h))
+
+    def _on_map(self, event):
+        if event.widget is self:
+            self.set_suspended('hidden', False)
+            self._on_configure(event)
+
+    def _on_unmap(self, event):
+        if event.widget is not self:
+            return
+        self.set_suspended('hidden', True)
+        if self.block_index is not None:
+            self.block_index.remove(self)
+
+    def _on_destroy(self, event):
+        if event.widget is self:
+            self._on_unmap(event)
+            self.worker.close()
+            self.store.remove(self.block_id)
+
+    @property
+    def suspended(self):
+        return self.store.is_suspended(self.block_id)
+
+    @property
+    def idle(self):
+        return self.store.is_idle(self.block_id)
+
+    def set_suspended(self, reason, suspended):
+        """Add or clear a suspend reason, resuming wakes the loops immediately"""
+        resumed = self.store.set_suspended(self.block_id, reason, suspended)
+        # Refresh right away on resume, the last colors/frame stay on screen meanwhile
+        self.worker.wake(refresh=resumed)
+        if resumed:
+            self.scheduler.wake()
+
+    def toggle_tracking(self, event=None):
+        if self.tracking:
+            self.stop_tracking()
+        else:
+            self.start_tracking()
+        return "break"
+
+    def start_tracking(self):
+        """Record what the block covers and start following it (main thread only).
+        
+        The template and every search render the windows behind the block
+        with capture_behind, so the block never hides or leaves the capture.
+        Where that isn't supported tracking is unavailable.
+        """
+        if self._is_destroyed:
+            return
+        if not supports_capture_behind():
+            events.warning("tracking.unsupported", "⚠️ Tracking needs Windows, block stays in place",
+                           block=self.block_id)
+            return
+        if self.worker.start_tracking():
+            self._redraw()
+
+    def stop_tracking(self):
+        if self.worker.stop_tracking():
+            self._redraw()
+
+    def _redraw(self):
+        try:
+            self.draw_block_smooth(self.winfo_width(), self.winfo_height())
+        except tk.TclError:
+            pass
+
+    def _move_tracked(self, x, y):
+        if self._is_destroyed or not self.tracking or self.drag.is_dragging(self):
+            return
+        try:
+            sw, sh = get_screen_size()
+            x = max(0, min(x, sw - self.winfo_width()))
+            y = max(0, min(y, sh - self.winfo_height()))
+            self.geometry(f"+{x}+{y}")
+        except tk.TclError:
+            pass
+
+    def _update_animation_ui(self):
+        """Update UI during animation (called from main thread)"""
+        try:
+            if self._is_destroyed:
+                return
+            
+            if not self.winfo_exists():
+                return
+            
+            # Get dimensions safely
+            try:
+                w, h = self.winfo_width(), self.winfo_height()
+            except tk.TclError:
+                return
+            
+            # Ensure minimum size
+            if w <= 0 or h <= 0:
+                return
+            
+            with self.store.lock:
+                gradient = self.store.renders_gradient(self.block_id)
+                colors = self.store.colors(self.block_id)
+            
+            if gradient:
+                # Create advanced multi-point gradient
+                gradient_img = create_advanced_gradient(w, h, colors)
+                self.gradient_photo = ImageTk.PhotoImage(gradient_img)
+            elif self.is_dynamic:
+                # Only overwrite current_color if dynamic
+                self.current_color = colors['top']
+            
+            self.draw_block_smooth(w, h)
+            
+        except tk.TclError:
+            pass
+        except Exception as e:
+            events.error("animation.error", f"Animation UI error: {e}", block=self.block_id)
+
+    def draw_block_smooth(self, w, h):
+        """Draw block with smooth transitions"""
+        try:
+            if self._is_destroyed:
+                return
+            
+            self.canvas.delete("all")
+            
+            if self.effect:
+                # Tiles get rebuilt at the new size on the next refresh
+                self._effect_tiles = {}
+                self.worker.effect_full_refresh = True
+                self.canvas.create_rectangle(0, 0, w, h, fill=self.base_color, outline=self.base_color)
+                if w > 20 and h > 20:
+                    self.canvas.create_text(5, 5, text="P" if self.effect == "pixelate" else "B",
+                                          fill=get_contrasting_color(self.base_color),
+                                          font=("Arial", 8, "bold"), anchor="nw", tags="indicator")
+                self._draw_tracking_indicator(w, h, self.base_color)
+                return
+            
+            gradient = self.store.renders_gradient(self.block_id)
+            if gradient and self.gradient_photo:
+                # Draw advanced gradient
+                self.canvas.create_image(0, 0, anchor=tk.NW, image=self.gradient_photo)
+            else:
+                # Draw solid color
+                self.canvas.create_rectangle(0, 0, w, h, fill=self.current_color, outline=self.current_color)
+            
+            # Minimal indicator
+            if self.is_dynamic and w > 20 and h > 20:
+                indicator_text = "D"
+                if gradient and self.store.has_flag(self.block_id, BLOCK_TRANSITIONING):
+                    indicator_text += "→"
+                
+                self.canvas.create_text(5, 5, text=indicator_text,
+                                      fill=get_contrasting_color(self.current_color),
+                                      font=("Arial", 8, "bold"), anchor="nw")
+            
+            self._draw_tracking_indicator(w, h, self.current_color)
+        except tk.TclError:
+            pass
+
+    def _draw_tracking_indicator(self, w, h, color):
+        if self.tracking and w > 40 and h > 20:
+            self.canvas.create_text(w - 5, 5, text="T",
+                                  fill=get_contrasting_color(color),
+                                  font=("Arial", 8, "bold"), anchor="ne", tags="indicator")
+
+    def draw_block(self, w, h):
+        """Regular drawing method"""
+        self.draw_block_smooth(w, h)
+
+    def change_color(self, event):
+        """Change block color - simplified behavior"""
+        try:
+            if self.is_dynamic or self.effect:
+                # Dynamic/effect block - do nothing on middle click
+                return
+            else:
+                # Static block - directly open color chooser
+                color = colorchooser.askcolor(initialcolor=self.base_color)[1]
+                if color and color.startswith('#'):
+                    self.store.set_mode(self.block_id, color, False)
+                    self.current_color = color
+                    self._update_animation_ui()
+                    self._request_autosave()
+        except (tk.TclError, AttributeError):
+            pass
+
+    def _request_autosave(self):
+        """Ask the app to autosave after a user edit"""
+        schedule = getattr(self.master, 'schedule_autosave', None)
+        if schedule:
+            schedule()
+
+    def apply_spec(self, x, y, w, h, color, is_dynamic, effect=None, phase=0.0):
+        """Reposition, resize, recolor and change the mode of this window in place"""
+        if self._is_destroyed:
+            return
+        
+        x, y, w, h = clamp_block_geometry(x, y, w, h)
+        color = normalize_color(color)
+        effect = effect if effect in Config.EFFECTS else None
+        
+        # Color and visibility changes keep tracking as it is
+        moved = self.store.geometry(self.block_id) != (x, y, w, h)
+        is_dynamic = is_dynamic and effect is None
+        mode_changed = (is_dynamic, effect) != (self.is_dynamic, self.effect)
+        
+        try:
+            self.geometry(f"{w}x{h}+{x}+{y}")
+            self.canvas.config(width=w, height=h)
+            
+            if mode_changed and (self.is_dynamic or self.effect):
+                self.stop_dynamic_color(wait=False)
+            
+            self.store.set_geometry(self.block_id, x, y, w, h)
+            self.store.set_mode(self.block_id, color, is_dynamic, effect)
+            if not is_dynamic:
+                self.current_color = color
+                self.gradient_photo = None
+            
+            self.config(bg=self.current_color)
+            self.canvas.config(bg=self.current_color)
+            self.draw_block_smooth(w, h)
+            
+            if mode_changed and self.winfo_ismapped():
+                if is_dynamic:
+                    self.start_dynamic_color(phase)
+                elif effect:
+                    self.start_effect()
+            
+            if self.tracking and moved:
+                # The block now covers something else, follow that instead
+                self.start_tracking()
+        except tk.TclError:
+            pass
+
+    def get_spec(self):
+        """Block data as an (x, y, w, h, color, is_dynamic, effect) spec tuple"""
+        if self._is_destroyed:
+            return None
+        return self.store.spec(self.block_id)
+
+    def get_block_data(self):
+        """Return block data for saving with validation"""
+        if self._is_destroyed:
+            return None
+        data = self.store.layout_data([self.block_id])
+        return data[0] if data else None
+
+    def start_drag(self, event):
+        if not self._is_destroyed:
+            self.drag.begin(self, "move", event.x, event.y)
+            try:
+                self.canvas.config(cursor="fleur")
+            except tk.TclError:
+                pass
+
+    def do_drag(self, event):
+        if self.drag.action_of(self) == "move" and not self._is_destroyed:
+            try:
+                dx = event.x - self.drag.x
+                dy = event.y - self.drag.y
+                sw, sh = get_screen_size()
+                w, h = self.winfo_width(), self.winfo_height()
+                new_x = max(0, min(self.winfo_x() + dx, sw - w))
+                new_y = max(0, min(self.winfo_y() + dy, sh - h))
+                
+                # Snap to neighboring blocks unless Shift is held
+                index = self.block_index
+                if index is not None and not event.state & 0x1:
+                    new_x, new_y = index.snap((new_x, new_y, new_x + w, new_y + h),
+                                              Config.SNAP_DISTANCE, exclude=self)
+                    new_x = max(0, min(new_x, sw - w))
+                    new_y = max(0, min(new_y, sh - h))
+                
+                self.geometry(f"+{new_x}+{new_y}")
+            except tk.TclError:
+                pass
+
+    def stop_drag(self, event):
+        was_moving = self.drag.end(self) == "move"
+        try:
+            self.canvas.config(cursor="")
+        except tk.TclError:
+            pass
+        if self.tracking and was_moving:
+            # The block now covers something else, follow that instead
+            self.start_tracking()
+        self._request_autosave()
+
+    def start_resize(self, event):
+        if not self._is_destroyed:
+            self.drag.begin(self, "resize", event.x, event.y)
             try:
                 self.canvas.config(cursor="bottom_right_corner")
             except tk.TclError:
                 pass
 
     def do_resize(self, event):
-        if self._drag_data["action"] == "resize" and not self._is_destroyed:
+        if self.drag.action_of(self) == "resize" and not self._is_destroyed:
             try:
                 w = max(30, min(event.x, Config.MAX_BLOCK_WIDTH))
                 h = max(30, min(event.y, Config.MAX_BLOCK_HEIGHT))
@@ -661,11 +2602,12 @@ class BlackBlock(tk.Toplevel):
                 pass
 
     def stop_resize(self, event):
-        self._drag_data["action"] = None
+        self.drag.end(self)
         try:
             self.canvas.config(cursor="")
         except tk.TclError:
             pass
+        self._request_autosave()
 
     def delete_block(self, event):
         """Safely delete block"""
@@ -675,24 +2617,49 @@ class BlackBlock(tk.Toplevel):
                 self.master.blocks.remove(self)
             self._is_destroyed = True
             self.destroy()
+            self._request_autosave()
         except (tk.TclError, AttributeError):
             pass
 
 class OverlayApp(tk.Tk):
-    def __init__(self):
+    def __init__(self, profiles=None):
+        enable_dpi_awareness()
         super().__init__()
+        update_screen_metrics(self)
+        
+        # Performance profile, hot-reloaded from the settings file
+        self.profiles = profiles or ProfileManager()
+        if self.profiles.active is None:
+            self.profiles.load()
         
         self.title("StreamBlock v0.3 (github.com/mirbyte)")
-        self.geometry("700x620")
+        scale = get_dpi_scale()
+        self.geometry(f"{round(700 * scale)}x{round(790 * scale)}")
         self.resizable(True, True)
         self.configure(bg="#FFFFFF")
         
         # Current settings for new blocks
         self.current_color = "#000000"
         self.use_dynamic_color = False
+        self.current_effect = None
+        self.events_window = None
+        
+        # Global pause of all detection/animation (button or hotkey)
+        self.paused = False
+        self.session_locked = False
         
-        # Config file in working directory
-        self.config_file = Config.CONFIG_FILE
+        # Layout profiles live in the working directory
+        self.current_profile = Config.DEFAULT_PROFILE
+        self.config_file = profile_path(self.current_profile)
+        self._profile_cache = {}  # name -> (mtime, parsed layout)
+        self._last_saved = {}  # name -> serialized layout last written
+        
+        # Autosave only tracks a profile once it was loaded or saved this
+        # session, so a fresh session can't overwrite a saved layout. Until
+        # then edits go to the recovery profile so a crash doesn't lose them.
+        self.autosave_enabled = True
+        self._autosave_attached = False
+        self._autosave_job = None
         
         # Make main window draggable
         self.bind("<Button-1>", self.start_move)
@@ -700,9 +2667,44 @@ class OverlayApp(tk.Tk):
         
         self.setup_ui()
         self.blocks = []
+        self._recovery_profile = self._rotate_recovery_profile()
+        self.block_index = SpatialGrid()
+        self.drag = DragController()
+        
+        # Block state for all windows, dynamic blocks share two scheduler threads
+        self.block_store = BlockStore()
+        self.scheduler = BlockScheduler(self.block_store, index=self.block_index, on_frame=self._queue_view_refresh)
+        self._view_refresh_lock = Lock()
+        self._views_to_refresh = set()
+        self._view_refresh_scheduled = False
+        self.scheduler.start()
+        
+        # State of an in-progress batched layout load
+        self._pending_load = None
+        self._pending_load_job = None
+        
+        # Hidden pre-built windows handed out when a layout grows
+        self._block_pool = []
+        self._pool_job = self.after(1000, self._replenish_pool)
+        
+        # Commands queued by the control server, applied on the main loop
+        self._command_queue = queue.SimpleQueue()
+        self._command_job = None
+        self.control_server = None
         
         # Periodic cleanup of destroyed blocks
         self.after(5000, self.cleanup_blocks)
+        
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        
+        self.after(Config.SETTINGS_POLL_MS, self.poll_settings)
+        self.after(Config.ACTIVITY_POLL_MS, self.poll_activity)
+        
+        # Pause hotkey: system-wide where supported, otherwise while the app has focus
+        self.pause_hotkey = GlobalHotkey(Config.PAUSE_HOTKEY, lambda: self.after(0, self.toggle_pause))
+        if not self.pause_hotkey.start():
+            self.pause_hotkey = None
+            self.bind_all("<Control-Alt-p>", lambda event: self.toggle_pause())
 
     def setup_ui(self):
         # Title
@@ -755,6 +2757,38 @@ class OverlayApp(tk.Tk):
                             width=2, height=1)
         info_btn.pack(side=tk.LEFT, padx=5)
         
+        # Block type frame (plain color or live pixelate/blur), only where
+        # blocks can see behind themselves
+        if supports_capture_behind():
+            effect_frame = tk.Frame(self, bg="#FFFFFF")
+            effect_frame.pack(pady=5)
+            
+            tk.Label(effect_frame, text="Block Type:",
+                    font=("Arial", 10), bg="#FFFFFF", fg="#000000").pack(side=tk.LEFT, padx=5)
+            
+            self.effect_var = tk.StringVar(value="Color")
+            effect_menu = tk.OptionMenu(effect_frame, self.effect_var, "Color", "Pixelate", "Blur",
+                                        command=self.set_effect)
+            effect_menu.config(font=("Arial", 9), width=10)
+            effect_menu.pack(side=tk.LEFT, padx=5)
+        
+        # Performance profile
+        perf_frame = tk.Frame(self, bg="#FFFFFF")
+        perf_frame.pack(pady=5)
+        
+        tk.Label(perf_frame, text="Performance:",
+                font=("Arial", 10), bg="#FFFFFF", fg="#000000").pack(side=tk.LEFT, padx=5)
+        
+        self.perf_var = tk.StringVar(value=self.profiles.active)
+        self.perf_menu = tk.OptionMenu(perf_frame, self.perf_var, self.profiles.active)
+        self.perf_menu.config(font=("Arial", 9), width=10)
+        self.perf_menu.pack(side=tk.LEFT, padx=5)
+        
+        self.perf_label = tk.Label(perf_frame, text="",
+                                  font=("Arial", 9), bg="#FFFFFF", fg="#808080")
+        self.perf_label.pack(side=tk.LEFT, padx=5)
+        self._refresh_performance_ui()
+        
         # Add block button
         add_btn = tk.Button(self, text="➕ Add New Block",
                            command=self.add_black_block,
@@ -778,29 +2812,100 @@ class OverlayApp(tk.Tk):
                             bg="#3498db", fg="white", font=("Arial", 10))
         load_btn.pack(side=tk.LEFT, padx=10)
         
+        # Layout profiles
+        profile_frame = tk.Frame(self, bg="#FFFFFF")
+        profile_frame.pack(pady=5)
+        
+        tk.Label(profile_frame, text="Profile:",
+                font=("Arial", 10), bg="#FFFFFF", fg="#000000").pack(side=tk.LEFT, padx=5)
+        
+        self.profile_var = tk.StringVar(value=self.current_profile)
+        self.profile_menu = tk.OptionMenu(profile_frame, self.profile_var, self.current_profile)
+        self.profile_menu.config(font=("Arial", 9), width=12)
+        self.profile_menu.pack(side=tk.LEFT, padx=5)
+        self._refresh_profile_menu()
+        
+        new_profile_btn = tk.Button(profile_frame, text="➕ New Profile",
+                                   command=self.new_profile,
+                                   bg="#34495e", fg="white", font=("Arial", 9))
+        new_profile_btn.pack(side=tk.LEFT, padx=5)
+        
+        self.autosave_var = tk.BooleanVar(value=self.autosave_enabled)
+        autosave_check = tk.Checkbutton(profile_frame, text="Autosave",
+                                       variable=self.autosave_var,
+                                       command=self.toggle_autosave,
+                                       bg="#FFFFFF", fg="#000000",
+                                       font=("Arial", 10))
+        autosave_check.pack(side=tk.LEFT, padx=5)
+        
         # Controls info
         controls_text = """Controls:
-• Left-drag: Move block • Right-drag: Resize block
-• Double-click: Delete block • Scrollwheel-click: Change color"""
+• Left-drag: Move block (snaps to neighbors, Shift: no snap) • Right-drag: Resize block
+• Double-click: Delete block • Scrollwheel-click: Change color
+• Ctrl+click: Toggle tracking (block follows the content under it)
+• Ctrl+Alt+P: Pause/resume all adapting blocks"""
         
         tk.Label(self, text=controls_text,
                 font=("Arial", 9),
                 bg="#FFFFFF", fg="#808080",
                 justify=tk.LEFT).pack(pady=10)
         
-        # Clear all button
-        clear_btn = tk.Button(self, text="🗑️ Clear All Blocks",
+        # Pause + clear buttons
+        action_frame = tk.Frame(self, bg="#FFFFFF")
+        action_frame.pack(pady=5)
+        
+        self.pause_btn = tk.Button(action_frame, text=f"⏸ Pause Adapting ({Config.PAUSE_HOTKEY})",
+                                  command=self.toggle_pause,
+                                  bg="#95a5a6", fg="white",
+                                  font=("Arial", 10))
+        self.pause_btn.pack(side=tk.LEFT, padx=10)
+        
+        clear_btn = tk.Button(action_frame, text="🗑️ Clear All Blocks",
                              command=self.clear_all_blocks,
                              bg="#95a5a6", fg="white",
                              font=("Arial", 10))
-        clear_btn.pack(pady=5)
+        clear_btn.pack(side=tk.LEFT, padx=10)
+        
+        events_btn = tk.Button(action_frame, text="📜 Events",
+                              command=self.show_events,
+                              bg="#95a5a6", fg="white",
+                              font=("Arial", 10))
+        events_btn.pack(side=tk.LEFT, padx=10)
+        
+        self.activity_label = tk.Label(self, text="",
+                                      font=("Arial", 9), bg="#FFFFFF", fg="#808080")
+        self.activity_label.pack(pady=2)
+
+    def _refresh_performance_ui(self):
+        """Show the active performance profile and its main timings"""
+        try:
+            menu = self.perf_menu["menu"]
+            menu.delete(0, "end")
+            for name in self.profiles.profiles:
+                menu.add_command(label=name, command=lambda n=name: self.select_performance_profile(n))
+            self.perf_var.set(self.profiles.active)
+            self.perf_label.config(text=f"detect {Config.DETECTION_INTERVAL:g}s • "
+                                        f"{Config.ANIMATION_FPS} fps • effects {Config.EFFECT_FPS} fps")
+        except tk.TclError:
+            pass
+
+    def select_performance_profile(self, name):
+        self.profiles.select(name)
+        self._refresh_performance_ui()
+
+    def poll_settings(self):
+        """Pick up edits to the settings file without restarting"""
+        if self.profiles.poll():
+            self._refresh_performance_ui()
+        self.after(Config.SETTINGS_POLL_MS, self.poll_settings)
 
     def show_dynamic_info(self):
         """Show information about dynamic mode"""
-        info_text = """Dynamic Color Mode
+        info_text = f"""Dynamic Color Mode
 
 • 8 detection points: 4 corners + 4 edges
-• 2-second detection intervals with 1-second transitions"""
+• {Config.DETECTION_INTERVAL:g}-second detection intervals with {Config.TRANSITION_DURATION:g}-second transitions
+• Timings follow the performance profile ({self.profiles.active})"""
         
         messagebox.showinfo("Dynamic Color Info", info_text)
 
@@ -824,24 +2929,165 @@ class OverlayApp(tk.Tk):
         else:
             self.color_preview.config(text="   ", bg=self.current_color)
 
-    def cleanup_blocks(self):
-        """Periodically remove destroyed blocks from list"""
-        try:
-            self.blocks = [block for block in self.blocks
-                          if not getattr(block, '_is_destroyed', False) and block.winfo_exists()]
-        except tk.TclError:
-            pass
+    def set_effect(self, choice):
+        """Select the block type for new blocks"""
+        effect = choice.lower() if choice.lower() in Config.EFFECTS else None
+        if effect and not self.current_effect:
+            messagebox.showinfo("Effect Blocks",
+                                "Pixelate/Blur blocks show a live filtered view of the windows behind them.\n\n"
+                                "They stay visible in recordings and streams. Content that can't be "
+                                "rendered off-screen (some protected video) shows as black.")
+        self.current_effect = effect
+
+    def show_events(self):
+        """Open (or raise) the recent events window"""
+        if self.events_window is not None and self.events_window.winfo_exists():
+            self.events_window.lift()
+            return
         
-        # Schedule next cleanup
-        self.after(5000, self.cleanup_blocks)
+        window = tk.Toplevel(self)
+        window.title("StreamBlock Events")
+        window.geometry("640x360")
+        window.configure(bg="#FFFFFF")
+        self.events_window = window
+        
+        top = tk.Frame(window, bg="#FFFFFF")
+        top.pack(fill=tk.X, padx=5, pady=5)
+        tk.Label(top, text="Level:", font=("Arial", 9), bg="#FFFFFF").pack(side=tk.LEFT)
+        window.level_var = tk.StringVar(value="info")
+        tk.OptionMenu(top, window.level_var, *EventLog.LEVELS,
+                      command=lambda _: self._refresh_events_view(reset=True)).pack(side=tk.LEFT, padx=5)
+        tk.Button(top, text="Clear", font=("Arial", 9),
+                  command=lambda: (events.clear(), self._refresh_events_view(reset=True))).pack(side=tk.LEFT, padx=5)
+        
+        window.text = tk.Text(window, font=("Consolas", 9), wrap=tk.NONE, state=tk.DISABLED)
+        window.text.tag_config("warning", foreground="#d35400")
+        window.text.tag_config("error", foreground="#c0392b")
+        window.text.tag_config("debug", foreground="#808080")
+        window.text.pack(fill=tk.BOTH, expand=True, padx=5, pady=(0, 5))
+        
+        self._refresh_events_view(reset=True)
 
-    def choose_color(self):
-        try:
+    def _refresh_events_view(self, reset=False):
+        """Append events logged since the last refresh, the view reads the ring buffer only"""
+        window = self.events_window
+        if window is None or not window.winfo_exists():
+            self.events_window = None
+            return
+        
+        if reset:
+            if getattr(window, "refresh_job", None):
+                window.after_cancel(window.refresh_job)
+            window.last_seq = 0
+            window.text.config(state=tk.NORMAL)
+            window.text.delete("1.0", tk.END)
+            window.text.config(state=tk.DISABLED)
+        
+        new_events = events.recent(window.last_seq, window.level_var.get())
+        if new_events:
+            window.text.config(state=tk.NORMAL)
+            for event in new_events:
+                stamp = time.strftime("%H:%M:%S", time.localtime(event['time']))
+                window.text.insert(tk.END, f"{stamp} {event['level'][:4].upper():4} {events.format(event)}\n",
+                                   event['level'])
+            # Same cap as the ring buffer so the widget never grows unbounded
+            lines = int(window.text.index("end-1c").split(".")[0])
+            if lines > Config.EVENT_BUFFER_SIZE:
+                window.text.delete("1.0", f"{lines - Config.EVENT_BUFFER_SIZE}.0")
+            window.text.config(state=tk.DISABLED)
+            window.text.see(tk.END)
+            window.last_seq = new_events[-1]['seq']
+        
+        window.refresh_job = window.after(Config.EVENT_VIEW_REFRESH_MS, self._refresh_events_view)
+
+    def toggle_pause(self):
+        """Pause or resume detection, animation, effects and tracking for every block"""
+        self.paused = not self.paused
+        for block in self.blocks:
+            block.set_suspended('paused', self.paused)
+        
+        try:
+            label = "▶ Resume Adapting" if self.paused else "⏸ Pause Adapting"
+            self.pause_btn.config(text=f"{label} ({Config.PAUSE_HOTKEY})")
+        except tk.TclError:
+            pass
+        self._update_activity_label()
+        events.info("app.pause", "⏸ Blocks paused" if self.paused else "▶ Blocks resumed")
+
+    def poll_activity(self):
+        """Suspend blocks that are offscreen or while the session is locked"""
+        update_screen_metrics(self)
+        self.session_locked = is_session_locked()
+        vx1, vy1, vx2, vy2 = get_virtual_screen_rect()
+        
+        for block in self.blocks:
+            block.set_suspended('locked', self.session_locked)
+            block.set_suspended('paused', self.paused)
+            rect = self.block_index.rect(block)
+            if rect is not None:
+                offscreen = rect[2] <= vx1 or rect[0] >= vx2 or rect[3] <= vy1 or rect[1] >= vy2
+                block.set_suspended('offscreen', offscreen)
+        
+        self._update_activity_label()
+        self.after(Config.ACTIVITY_POLL_MS, self.poll_activity)
+
+    def _update_activity_label(self):
+        adaptive = [block for block in self.blocks if block.is_dynamic or block.effect or block.tracking]
+        if not adaptive:
+            text = ""
+        elif self.paused:
+            text = f"Paused • {len(adaptive)} adaptive blocks"
+        elif self.session_locked:
+            text = f"Session locked • {len(adaptive)} adaptive blocks suspended"
+        else:
+            suspended = sum(1 for block in adaptive if block.suspended)
+            idle = sum(1 for block in adaptive if not block.suspended and block.idle)
+            running = len(adaptive) - suspended - idle
+            text = f"{running} adapting • {idle} idle • {suspended} suspended"
+        try:
+            self.activity_label.config(text=text)
+        except tk.TclError:
+            pass
+
+    def _queue_view_refresh(self, block_ids):
+        """Redraw blocks whose colors changed (called from the animation thread)"""
+        with self._view_refresh_lock:
+            self._views_to_refresh.update(block_ids)
+            if self._view_refresh_scheduled:
+                return
+            self._view_refresh_scheduled = True
+        try:
+            self.after_idle(self._refresh_views)
+        except (tk.TclError, RuntimeError):
+            self._view_refresh_scheduled = False
+
+    def _refresh_views(self):
+        with self._view_refresh_lock:
+            block_ids, self._views_to_refresh = self._views_to_refresh, set()
+            self._view_refresh_scheduled = False
+        for block_id in block_ids:
+            block = self.block_store.key(block_id)
+            if isinstance(block, BlackBlock):
+                block._update_animation_ui()
+
+    def cleanup_blocks(self):
+        """Periodically remove destroyed blocks from list"""
+        try:
+            self.blocks = [block for block in self.blocks
+                          if not getattr(block, '_is_destroyed', False) and block.winfo_exists()]
+        except tk.TclError:
+            pass
+        
+        # Schedule next cleanup
+        self.after(5000, self.cleanup_blocks)
+
+    def choose_color(self):
+        try:
             color = colorchooser.askcolor(initialcolor=self.current_color)[1]
             if color and color.startswith('#'):
                 self.set_color(color)
         except Exception as e:
-            print(f"Color selection error: {e}")
+            events.error("app.error", f"Color selection error: {e}")
 
     def set_color(self, color):
         if color and color.startswith('#'):
@@ -872,95 +3118,491 @@ class OverlayApp(tk.Tk):
             w, h = sw // 8, sh // 15
             x, y = sw // 3, sh // 3
             
-            block = BlackBlock(self, x, y, w, h, self.current_color, self.use_dynamic_color)
+            block = BlackBlock(self, x, y, w, h, self.current_color, self.use_dynamic_color,
+                               effect=self.current_effect)
             self.blocks.append(block)
             
-            mode = "8-point dynamic" if self.use_dynamic_color else "static"
-            print(f"⬛ Added {mode} block ({self.current_color}) at ({x}, {y}) size {w}x{h}")
+            mode = self.current_effect or ("8-point dynamic" if self.use_dynamic_color else "static")
+            events.info("app.add", f"⬛ Added {mode} block ({self.current_color}) at ({x}, {y}) size {w}x{h}")
             
         except Exception as e:
-            print(f"Failed to create block: {e}")
+            events.error("app.error", f"Failed to create block: {e}")
             messagebox.showerror("Error", f"Failed to create block: {str(e)}")
 
+    def collect_layout_data(self):
+        """Serializable data for all live blocks"""
+        return self.block_store.layout_data([block.block_id for block in self.blocks if not block._is_destroyed])
+
+    def write_profile(self, name, layout_data):
+        """Atomically write a profile if its contents changed, returns True if written"""
+        serialized = json.dumps(layout_data, indent=2)
+        if self._last_saved.get(name) == serialized:
+            return False
+        
+        path = profile_path(name)
+        write_text_atomic(path, serialized)
+        self._last_saved[name] = serialized
+        try:
+            self._profile_cache[name] = (os.path.getmtime(path), layout_data)
+        except OSError:
+            self._profile_cache.pop(name, None)
+        return True
+
+    def read_profile(self, name):
+        """Parsed layout of a profile, served from memory while the file is unchanged"""
+        path = profile_path(name)
+        mtime = os.path.getmtime(path)
+        
+        cached = self._profile_cache.get(name)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        
+        with open(path, 'r') as f:
+            text = f.read()
+        layout_data = json.loads(text)
+        
+        if not isinstance(layout_data, list):
+            raise ValueError("Invalid layout file format")
+        
+        self._profile_cache[name] = (mtime, layout_data)
+        self._last_saved[name] = json.dumps(layout_data, indent=2)
+        return layout_data
+
+    def schedule_autosave(self):
+        """Debounce autosave so a burst of edits causes a single write"""
+        if not self.autosave_enabled:
+            return
+        
+        if self._autosave_job:
+            try:
+                self.after_cancel(self._autosave_job)
+            except tk.TclError:
+                pass
+        self._autosave_job = self.after(Config.AUTOSAVE_DELAY_MS, self.autosave)
+
+    def _rotate_recovery_profile(self):
+        """Move a previous session's recovery file aside before this session autosaves.
+        
+        The old blocks get a timestamped profile of their own so nothing in
+        this session overwrites them. Returns the profile to autosave to.
+        """
+        name = Config.RECOVERY_PROFILE
+        if not os.path.exists(profile_path(name)):
+            return name
+        
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        kept = f"{name}-{stamp}"
+        for n in itertools.count(2):
+            if not os.path.exists(profile_path(kept)):
+                break
+            kept = f"{name}-{stamp}-{n}"
+        try:
+            os.replace(profile_path(name), profile_path(kept))
+        except OSError as e:
+            # Leave the old file alone and autosave next to it instead
+            events.error("layout.error", f"Failed to keep recovery profile: {e}")
+            return kept
+        events.info("layout.recovery", f"💾 Blocks from an unsaved session are kept in profile '{kept}'")
+        self._refresh_profile_menu()
+        return name
+
+    def autosave(self):
+        """Write the current layout to the active profile (or the recovery profile) if it changed"""
+        self._autosave_job = None
+        if self._pending_load is not None:
+            # Save once the load has finished instead of dropping the edit
+            self.schedule_autosave()
+            return
+        
+        name = self.current_profile if self._autosave_attached else self._recovery_profile
+        try:
+            layout_data = self.collect_layout_data()
+            if self.write_profile(name, layout_data):
+                events.info("layout.autosave", f"💾 Autosaved {len(layout_data)} blocks to {profile_path(name)}")
+        except Exception as e:
+            events.error("layout.error", f"Autosave failed: {e}")
+
+    def flush_autosave(self):
+        """Run a pending autosave immediately"""
+        if self._autosave_job:
+            try:
+                self.after_cancel(self._autosave_job)
+            except tk.TclError:
+                pass
+            self.autosave()
+
+    def toggle_autosave(self):
+        self.autosave_enabled = self.autosave_var.get()
+        if self.autosave_enabled:
+            self.schedule_autosave()
+        else:
+            self.flush_autosave()
+
+    def _refresh_profile_menu(self):
+        """Rebuild the profile dropdown from the files on disk"""
+        try:
+            menu = self.profile_menu["menu"]
+            menu.delete(0, "end")
+            profiles = list_profiles()
+            if self.current_profile not in profiles:
+                profiles.append(self.current_profile)
+            for name in profiles:
+                menu.add_command(label=name, command=lambda n=name: self.switch_profile(n))
+            self.profile_var.set(self.current_profile)
+        except tk.TclError:
+            pass
+
+    def switch_profile(self, name):
+        """Make another profile active and show its layout"""
+        if name == self.current_profile:
+            return
+        
+        self.flush_autosave()
+        
+        try:
+            layout_data = self.read_profile(name) if os.path.exists(profile_path(name)) else []
+        except Exception as e:
+            error_msg = f"Failed to load profile '{name}': {str(e)}"
+            events.error("app.error", error_msg)
+            messagebox.showerror("Error", error_msg)
+            self.profile_var.set(self.current_profile)
+            return
+        
+        self.current_profile = name
+        self.config_file = profile_path(name)
+        self.profile_var.set(name)
+        self._autosave_attached = True
+        
+        specs = self.parse_layout(layout_data)
+        self.apply_layout(specs)
+        events.info("layout.profile", f"🗂️ Switched to profile '{name}' ({len(specs)} blocks)")
+
+    def new_profile(self):
+        """Save the current blocks as a new profile and switch to it"""
+        name = simpledialog.askstring("New Profile", "Profile name:", parent=self)
+        if name is None:
+            return
+        
+        name = name.strip()
+        if not is_valid_profile_name(name):
+            messagebox.showerror("Error", "Profile names may only contain letters, digits, spaces, '-' and '_'.")
+            return
+        if os.path.exists(profile_path(name)):
+            messagebox.showerror("Error", f"Profile '{name}' already exists.")
+            return
+        
+        try:
+            self.flush_autosave()
+            self.write_profile(name, self.collect_layout_data())
+        except Exception as e:
+            error_msg = f"Failed to create profile: {str(e)}"
+            events.error("app.error", error_msg)
+            messagebox.showerror("Error", error_msg)
+            return
+        
+        self.current_profile = name
+        self.config_file = profile_path(name)
+        self._autosave_attached = True
+        self._refresh_profile_menu()
+        events.info("layout.profile", f"🗂️ Created profile '{name}'")
+
     def save_layout(self):
         if not self.blocks:
             messagebox.showwarning("Warning", "No blocks to save!")
             return
         
         try:
-            layout_data = []
-            for block in self.blocks:
-                block_data = block.get_block_data()
-                if block_data:
-                    layout_data.append(block_data)
+            layout_data = self.collect_layout_data()
             
             if not layout_data:
                 messagebox.showwarning("Warning", "No valid blocks to save!")
                 return
             
-            with open(self.config_file, 'w') as f:
-                json.dump(layout_data, f, indent=2)
+            self.write_profile(self.current_profile, layout_data)
+            self._autosave_attached = True
             
             messagebox.showinfo("Success", f"Layout saved!\n{len(layout_data)} blocks saved to {self.config_file}")
-            print(f"💾 Saved {len(layout_data)} blocks to {self.config_file}")
+            events.info("layout.save", f"💾 Saved {len(layout_data)} blocks to {self.config_file}")
             
         except Exception as e:
             error_msg = f"Failed to save: {str(e)}"
-            print(error_msg)
+            events.error("app.error", error_msg)
             messagebox.showerror("Error", error_msg)
 
+    def parse_layout(self, layout_data):
+        """Validate layout entries into (x, y, w, h, color, is_dynamic, effect) specs"""
+        return parse_layout_specs(layout_data)
+
     def load_layout(self):
         if not os.path.exists(self.config_file):
             messagebox.showwarning("Warning", f"No saved layout found!\n{self.config_file} doesn't exist.")
             return
         
         try:
-            with open(self.config_file, 'r') as f:
-                layout_data = json.load(f)
+            layout_data = self.read_profile(self.current_profile)
             
-            if not isinstance(layout_data, list):
-                raise ValueError("Invalid layout file format")
+            # Validate everything up front so the batches only create windows
+            specs = self.parse_layout(layout_data)
             
-            # Clear existing blocks
-            self.clear_all_blocks()
+            if not specs:
+                messagebox.showwarning("Warning", "No valid blocks found in layout file!")
+                return
             
-            # Create blocks from saved data
-            valid_blocks = 0
-            for block_data in layout_data:
-                try:
-                    if not all(key in block_data for key in ['x', 'y', 'width', 'height']):
-                        print(f"Skipping invalid block data: {block_data}")
-                        continue
-                    
-                    block = BlackBlock(
-                        self,
-                        int(block_data['x']),
-                        int(block_data['y']),
-                        int(block_data['width']),
-                        int(block_data['height']),
-                        block_data.get('color', '#000000'),
-                        block_data.get('is_dynamic', False)
-                    )
-                    
-                    self.blocks.append(block)
-                    valid_blocks += 1
-                    
-                except (ValueError, TypeError, KeyError) as e:
-                    print(f"Skipping invalid block: {e}")
-                    continue
+            self._autosave_attached = True
+            self.apply_layout(specs)
             
-            if valid_blocks > 0:
-                messagebox.showinfo("Success", f"Layout loaded!\n{valid_blocks} blocks loaded from {self.config_file}")
-                print(f"📁 Loaded {valid_blocks} blocks from {self.config_file}")
-            else:
-                messagebox.showwarning("Warning", "No valid blocks found in layout file!")
+            messagebox.showinfo("Success", f"Layout loaded!\n{len(specs)} blocks loaded from {self.config_file}")
                 
         except Exception as e:
             error_msg = f"Failed to load: {str(e)}"
-            print(error_msg)
+            events.error("app.error", error_msg)
             messagebox.showerror("Error", error_msg)
 
+    def apply_layout(self, specs):
+        """Turn the current blocks into the given layout with as little window churn as possible.
+        
+        Blocks that already match a spec are left alone, the rest are
+        repositioned/recolored in place (preferring blocks with the same
+        dynamic mode and nearby position). Only the difference is created,
+        from the hidden pool first, or released back to the pool.
+        """
+        start_time = time.perf_counter()
+        self._cancel_pending_load()
+        
+        try:
+            self.update_idletasks()
+        except tk.TclError:
+            pass
+        
+        # Exact matches stay untouched
+        available = {}
+        for block in self.blocks:
+            spec = block.get_spec()
+            if spec is not None:
+                available.setdefault(spec, []).append(block)
+        
+        unmatched_specs = []
+        kept = []
+        for spec in specs:
+            spec = (spec[0], spec[1], spec[2], spec[3], spec[4], bool(spec[5]), spec[6])
+            candidates = available.get(spec)
+            if candidates:
+                kept.append(candidates.pop())
+            else:
+                unmatched_specs.append(spec)
+        
+        leftover = [(block, spec) for spec, blocks in available.items() for block in blocks]
+        
+        # Reuse remaining windows for the nearest spec, same dynamic mode first
+        updated = []
+        for spec in unmatched_specs[:]:
+            if not leftover:
+                break
+            x, y, w, h, color, is_dynamic, effect = spec
+            best_index = min(range(len(leftover)), key=lambda i: (
+                leftover[i][1][5:7] != (is_dynamic, effect),
+                abs(leftover[i][1][0] - x) + abs(leftover[i][1][1] - y) +
+                abs(leftover[i][1][2] - w) + abs(leftover[i][1][3] - h)
+            ))
+            best = leftover.pop(best_index)[0]
+            best.apply_spec(x, y, w, h, color, is_dynamic, effect, random.random() * Config.DETECTION_INTERVAL)
+            updated.append(best)
+            unmatched_specs.remove(spec)
+        
+        # Surplus windows go back to the pool
+        for block, _ in leftover:
+            self._release_block(block)
+        
+        # Grow from the pool, then build whatever is still missing in batches
+        pooled = []
+        while unmatched_specs and self._block_pool:
+            x, y, w, h, color, is_dynamic, effect = unmatched_specs.pop(0)
+            block = self._block_pool.pop()
+            block.apply_spec(x, y, w, h, color, is_dynamic, effect)
+            block.reveal(random.random() * Config.DETECTION_INTERVAL)
+            pooled.append(block)
+        
+        self.blocks = kept + updated + pooled
+        
+        if unmatched_specs:
+            self.load_blocks_batched(unmatched_specs, source=self.config_file, notify=False)
+        
+        self._schedule_pool_replenish()
+        
+        elapsed = (time.perf_counter() - start_time) * 1000
+        events.info("layout.apply", f"🔁 Applied layout in {elapsed:.0f} ms: {len(kept)} kept, {len(updated)} updated, "
+                    f"{len(pooled)} from pool, {len(unmatched_specs)} new, {len(leftover)} released")
+
+    def _release_block(self, block):
+        """Hide a block and keep it for reuse, or destroy it if the pool is full"""
+        if block in self.blocks:
+            self.blocks.remove(block)
+        
+        try:
+            if not block._is_destroyed and len(self._block_pool) < Config.BLOCK_POOL_SIZE:
+                block.stop_tracking()
+                block.stop_dynamic_color(wait=False)
+                block.withdraw()
+                self.block_store.set_mode(block.block_id, block.base_color, False)
+                self._block_pool.append(block)
+                return
+        except tk.TclError:
+            pass
+        
+        try:
+            block.stop_dynamic_color(wait=False)
+            block._is_destroyed = True
+            block.destroy()
+        except tk.TclError:
+            pass
+
+    def _schedule_pool_replenish(self):
+        if self._pool_job is None:
+            self._pool_job = self.after(500, self._replenish_pool)
+
+    def _replenish_pool(self):
+        """Pre-build one hidden window per idle slot until the pool is full"""
+        self._pool_job = None
+        
+        # Don't compete with a layout that is still being built
+        if self._pending_load is not None:
+            self._schedule_pool_replenish()
+            return
+        
+        self._block_pool = [block for block in self._block_pool if not block._is_destroyed]
+        if len(self._block_pool) >= Config.BLOCK_POOL_SIZE:
+            return
+        
+        try:
+            block = BlackBlock(self, 0, 0, Config.MIN_BLOCK_SIZE, Config.MIN_BLOCK_SIZE, deferred=True)
+            self._block_pool.append(block)
+        except (tk.TclError, ValueError) as e:
+            events.error("app.error", f"Failed to pre-build block: {e}")
+            return
+        
+        if len(self._block_pool) < Config.BLOCK_POOL_SIZE:
+            self._pool_job = self.after_idle(self._replenish_pool)
+
+    def load_blocks_batched(self, specs, source=None, notify=True):
+        """Create blocks in batches across main-loop iterations and map them together.
+        
+        Each batch creates LOAD_BATCH_SIZE withdrawn windows and then yields
+        back to the event loop so the UI stays responsive. Once every window
+        exists they are all mapped in one pass and dynamic detection starts
+        with staggered phases.
+        """
+        self._cancel_pending_load()
+        
+        load = {
+            'specs': specs,
+            'index': 0,
+            'created': [],
+            'source': source,
+            'notify': notify,
+            'batches': 0,
+            'create_time': 0.0,
+            'start_time': time.perf_counter()
+        }
+        self._pending_load = load
+        self._pending_load_job = self.after_idle(self._load_next_batch, load)
+
+    def _load_next_batch(self, load):
+        """Create the next batch of deferred blocks"""
+        if load is not self._pending_load:
+            return
+        
+        more = False
+        try:
+            batch_start = time.perf_counter()
+            start = load['index']
+            batch = load['specs'][start:start + Config.LOAD_BATCH_SIZE]
+            
+            for x, y, w, h, color, is_dynamic, effect in batch:
+                try:
+                    block = BlackBlock(self, x, y, w, h, color, is_dynamic, deferred=True, effect=effect)
+                    load['created'].append(block)
+                except Exception as e:
+                    events.warning("layout.invalid", f"Skipping invalid block: {e}")
+            
+            load['index'] = start + len(batch)
+            load['batches'] += 1
+            load['create_time'] += time.perf_counter() - batch_start
+            
+            more = load['index'] < len(load['specs'])
+            if more:
+                # Let pending events run before the next batch
+                self._pending_load_job = self.after(1, self._load_next_batch, load)
+            else:
+                self._pending_load_job = None
+                self._finish_batched_load(load)
+        finally:
+            # A failed load must not keep autosave and the pool waiting forever
+            if not more and self._pending_load is load:
+                self._pending_load = None
+
+    def _finish_batched_load(self, load):
+        """Map all loaded blocks at once and start dynamic detection with jittered phases"""
+        self._pending_load = None
+        created = load['created']
+        
+        map_start = time.perf_counter()
+        dynamic_blocks = [block for block in created if block.is_dynamic]
+        count = len(dynamic_blocks)
+        
+        for block in created:
+            if not block.is_dynamic:
+                block.reveal()
+        
+        # Spread first detection ticks evenly over one interval (stratified jitter)
+        for i, block in enumerate(dynamic_blocks):
+            phase = (i + random.random()) * Config.DETECTION_INTERVAL / count
+            block.reveal(phase)
+        
+        self.blocks.extend(created)
+        
+        try:
+            self.update_idletasks()
+        except tk.TclError:
+            pass
+        
+        map_time = time.perf_counter() - map_start
+        total_time = time.perf_counter() - load['start_time']
+        valid_blocks = len(created)
+        source = load['source'] or "layout"
+        
+        if valid_blocks > 0:
+            events.info("layout.load", f"📁 Loaded {valid_blocks} blocks from {source} in {total_time * 1000:.0f} ms "
+                        f"({load['batches']} batches, create {load['create_time'] * 1000:.0f} ms, "
+                        f"map {map_time * 1000:.0f} ms, {count} dynamic)")
+            if load['notify']:
+                messagebox.showinfo("Success", f"Layout loaded!\n{valid_blocks} blocks loaded from {source}")
+        elif load['notify']:
+            messagebox.showwarning("Warning", "No valid blocks found in layout file!")
+
+    def _cancel_pending_load(self):
+        """Abort an in-progress batched load and destroy its unmapped blocks"""
+        load = self._pending_load
+        if load is None:
+            return
+        
+        self._pending_load = None
+        if self._pending_load_job:
+            try:
+                self.after_cancel(self._pending_load_job)
+            except tk.TclError:
+                pass
+            self._pending_load_job = None
+        
+        for block in load['created']:
+            try:
+                block._is_destroyed = True
+                block.destroy()
+            except tk.TclError:
+                pass
+
     def clear_all_blocks(self):
+        self._cancel_pending_load()
+        
         for block in self.blocks[:]:
             try:
                 block.stop_dynamic_color()
@@ -970,11 +3612,1235 @@ class OverlayApp(tk.Tk):
                 pass
         
         self.blocks.clear()
-        print("🗑️ Cleared all blocks")
+        events.info("app.clear", "🗑️ Cleared all blocks")
+
+    # --- Control server commands ---
+
+    def start_control_server(self, host=None, port=None):
+        """Listen for local automation commands (see ControlServer)"""
+        host = host or Config.IPC_HOST
+        port = Config.IPC_PORT if port is None else port
+        
+        self.control_server = ControlServer(self, host, port)
+        self.control_server.start()
+        self._command_job = self.after(Config.IPC_POLL_MS, self._drain_commands)
+        events.info("ipc.start", f"🔌 Control server listening on {host}:{self.control_server.port}")
+
+    def submit_commands(self, commands):
+        """Queue a batch of commands from any thread, returns a Future of the results"""
+        future = futures.Future()
+        self._command_queue.put((commands, future))
+        return future
+
+    def _drain_commands(self):
+        """Apply everything queued since the last poll as one transaction"""
+        batches = []
+        try:
+            while True:
+                batches.append(self._command_queue.get_nowait())
+        except queue.Empty:
+            pass
+        
+        try:
+            if batches:
+                transaction = CommandTransaction(self)
+                try:
+                    for commands, future in batches:
+                        results = [transaction.execute(command) for command in commands]
+                        transaction.pending_results.append((future, results))
+                    transaction.commit()
+                except Exception as e:
+                    events.error("ipc.error", f"Command batch failed: {e}")
+                    for _, future in batches:
+                        if not future.done():
+                            future.set_exception(e)
+        finally:
+            # Keep serving even if a batch blew up
+            self._command_job = self.after(Config.IPC_POLL_MS, self._drain_commands)
+
+    def on_close(self):
+        """Flush pending autosave and stop block threads before exiting"""
+        if self.pause_hotkey:
+            self.pause_hotkey.stop()
+        if self.control_server:
+            self.control_server.stop()
+        self.flush_autosave()
+        self.scheduler.stop()
+        self.clear_all_blocks()
+        for block in self._block_pool:
+            try:
+                block.destroy()
+            except tk.TclError:
+                pass
+        self._block_pool.clear()
+        self.destroy()
+
+
+
+# --- Local control server ---
+#
+# Newline-delimited JSON over localhost TCP. Each request line is one
+# command object or a list of them; the reply line holds one result per
+# command:
+#
+#   -> [{"op": "create", "x": 10, "y": 10, "width": 200, "height": 80},
+#       {"op": "recolor", "id": 3, "color": "#ff0000"}]
+#   <- {"ok": true, "results": [{"ok": true, "id": 7}, {"ok": true}]}
+#
+# Ops: ping, list, create, move, resize, recolor, show, hide, track, query,
+# delete, apply. query returns the ids of blocks overlapping a rectangle.
+#
+# The first line of every connection must be {"auth": "<token>"} with the
+# token from IPC_TOKEN_FILE, written when the server starts. A wrong token
+# or a line that isn't JSON closes the connection, so web pages posting to
+# the port can't drive it.
+# Everything received between two main-loop polls is applied as a single
+# transaction, so a burst of updates costs one redraw per block.
+
+class CommandTransaction:
+    """Collects block updates from a batch of commands and applies them once"""
+    
+    def __init__(self, app):
+        self.app = app
+        self.blocks = {block.block_id: block for block in app.blocks}
+        self.pending = {}  # block -> {field: value}
+        self.pending_results = []
+        self.changed = False
+
+    def execute(self, command):
+        try:
+            if not isinstance(command, dict):
+                raise ValueError("command must be an object")
+            handler = getattr(self, f"op_{command.get('op')}", None)
+            if handler is None:
+                raise ValueError(f"unknown op: {command.get('op')}")
+            result = handler(command) or {}
+            result["ok"] = True
+            return result
+        except Exception as e:
+            return {"ok": False, "error": str(e)}
 
+    @staticmethod
+    def _number(command, key, default=None):
+        """Integer field of a command, finite numbers only"""
+        value = command.get(key, default)
+        if value is None:
+            raise KeyError(f"missing {key}")
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+            raise ValueError(f"{key} must be a finite number")
+        return int(value)
+
+    @staticmethod
+    def _color(command, default=None):
+        color = normalize_color(command.get("color", default), None)
+        if color is None:
+            raise ValueError(f"invalid color: {command.get('color')!r}")
+        return color
+
+    def _block(self, command):
+        block = self.blocks.get(self._number(command, "id"))
+        if block is None or block._is_destroyed:
+            raise KeyError(f"no block with id {command['id']}")
+        return block
+
+    def _update(self, command, **fields):
+        block = self._block(command)
+        self.pending.setdefault(block, {}).update(fields)
+        self.changed = True
+
+    def op_ping(self, command):
+        return {"time": time.time()}
+
+    def op_list(self, command):
+        self.flush()
+        blocks = []
+        for block in self.blocks.values():
+            data = block.get_block_data()
+            if data:
+                data["id"] = block.block_id
+                data["visible"] = bool(block.winfo_ismapped())
+                blocks.append(data)
+        return {"blocks": blocks}
+
+    def op_create(self, command):
+        self.flush()
+        # Validate everything before a window exists
+        x, y = self._number(command, "x"), self._number(command, "y")
+        w, h = self._number(command, "width"), self._number(command, "height")
+        color = self._color(command, self.app.current_color)
+        effect = command.get("effect")
+        if effect is not None and effect not in Config.EFFECTS:
+            raise ValueError(f"unknown effect: {effect}")
+        if effect is not None and not supports_capture_behind():
+            raise ValueError("effect blocks are not supported on this platform")
+        block = BlackBlock(self.app, x, y, w, h, color, bool(command.get("dynamic", False)), effect=effect)
+        self.app.blocks.append(block)
+        self.blocks[block.block_id] = block
+        self.changed = True
+        return {"id": block.block_id}
+
+    def op_move(self, command):
+        self._update(command, x=self._number(command, "x"), y=self._number(command, "y"))
+
+    def op_resize(self, command):
+        self._update(command, width=self._number(command, "width"), height=self._number(command, "height"))
+
+    def op_recolor(self, command):
+        self._update(command, color=self._color(command))
+
+    def op_show(self, command):
+        self._update(command, visible=True)
+
+    def op_hide(self, command):
+        self._update(command, visible=False)
+
+    def op_track(self, command):
+        block = self._block(command)
+        self.flush()
+        if command.get("enabled", True):
+            if not supports_capture_behind():
+                raise ValueError("tracking is not supported on this platform")
+            block.start_tracking()
+        else:
+            block.stop_tracking()
+
+    def op_query(self, command):
+        x, y = self._number(command, "x"), self._number(command, "y")
+        rect = (x, y, x + self._number(command, "width", 1), y + self._number(command, "height", 1))
+        self.flush()
+        self.app.update_idletasks()
+        return {"ids": sorted(block.block_id for block, _ in self.app.block_index.query(rect))}
+
+    def op_delete(self, command):
+        block = self._block(command)
+        self.flush()
+        block.stop_dynamic_color(wait=False)
+        if block in self.app.blocks:
+            self.app.blocks.remove(block)
+        block._is_destroyed = True
+        block.destroy()
+        del self.blocks[block.block_id]
+        self.changed = True
+
+    def op_apply(self, command):
+        layout_data = command["blocks"]
+        if not isinstance(layout_data, list):
+            raise ValueError("blocks must be a list")
+        self.flush()
+        self.app.apply_layout(self.app.parse_layout(layout_data))
+        self.blocks = {block.block_id: block for block in self.app.blocks}
+        self.changed = True
+
+    def flush(self):
+        """Apply the accumulated per-block updates with one geometry change and redraw each"""
+        pending, self.pending = self.pending, {}
+        for block, fields in pending.items():
+            if block._is_destroyed:
+                continue
+            try:
+                x, y, w, h, color, is_dynamic, effect = block.get_spec()
+                block.apply_spec(fields.get("x", x), fields.get("y", y),
+                                 fields.get("width", w), fields.get("height", h),
+                                 fields.get("color", color), is_dynamic, effect)
+                if fields.get("visible") is True:
+                    block.deiconify()
+                elif fields.get("visible") is False:
+                    block.withdraw()
+            except (tk.TclError, TypeError):
+                pass
+
+    def commit(self):
+        self.flush()
+        try:
+            self.app.update_idletasks()
+        except tk.TclError:
+            pass
+        
+        if self.changed:
+            self.app.schedule_autosave()
+        
+        for future, results in self.pending_results:
+            future.set_result(results)
+
+
+class ControlRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        authenticated = False
+        for line in self.rfile:
+            line = line.strip()
+            if not line:
+                continue
+            
+            try:
+                message = json.loads(line)
+            except ValueError:
+                # Not our protocol (e.g. an HTTP request from a browser)
+                break
+            
+            if not authenticated:
+                token = message.get("auth") if isinstance(message, dict) else None
+                if not isinstance(token, str) or not secrets.compare_digest(token, self.server.token):
+                    self._reply({"ok": False, "error": "authentication required"})
+                    break
+                authenticated = True
+                if not self._reply({"ok": True}):
+                    break
+                continue
+            
+            try:
+                commands = message if isinstance(message, list) else [message]
+                results = self.server.app.submit_commands(commands).result(timeout=Config.IPC_TIMEOUT)
+                reply = {"ok": all(r.get("ok") for r in results), "results": results}
+            except Exception as e:
+                reply = {"ok": False, "error": str(e)}
+            
+            if not self._reply(reply):
+                break
+
+    def _reply(self, reply):
+        try:
+            self.wfile.write(json.dumps(reply, separators=(',', ':')).encode() + b"\n")
+            return True
+        except OSError:
+            return False
+
+
+class ControlServer(socketserver.ThreadingTCPServer):
+    """Localhost command endpoint, one thread per client connection"""
+    allow_reuse_address = True
+    daemon_threads = True
+    
+    def __init__(self, app, host, port):
+        super().__init__((host, port), ControlRequestHandler)
+        self.app = app
+        self.port = self.server_address[1]
+        self.token = load_ipc_token(create=True)
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def load_ipc_token(create=False):
+    """Control server token from IPC_TOKEN_FILE, a new one is written if missing and create is set"""
+    try:
+        with open(Config.IPC_TOKEN_FILE, 'r') as f:
+            token = f.read().strip()
+        if token:
+            return token
+    except FileNotFoundError:
+        if not create:
+            raise
+    if not create:
+        raise ValueError(f"{Config.IPC_TOKEN_FILE} is empty")
+    token = secrets.token_hex(16)
+    # Temp files are created owner-only, the rename keeps that
+    write_text_atomic(Config.IPC_TOKEN_FILE, token)
+    return token
+
+class ControlClient:
+    """Minimal client for the control server"""
+    
+    def __init__(self, host=None, port=None, timeout=10.0):
+        token = load_ipc_token()
+        self.sock = socket.create_connection((host or Config.IPC_HOST,
+                                              Config.IPC_PORT if port is None else port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile('rb')
+        reply = self.send({"auth": token})
+        if not reply.get("ok"):
+            self.close()
+            raise ConnectionError(f"control server rejected the token: {reply.get('error')}")
+
+    def send(self, commands):
+        """Send one command or a list of commands, returns the decoded reply"""
+        self.sock.sendall(json.dumps(commands, separators=(',', ':')).encode() + b"\n")
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError("control server closed the connection")
+        return json.loads(line)
+
+    def close(self):
+        try:
+            self.reader.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+
+def run_ipc_benchmark(host, port, count, batch_size):
+    """Measure round-trip latency and command throughput against a running app"""
+    client = ControlClient(host, port)
+    try:
+        reply = client.send({"op": "create", "x": 100, "y": 100, "width": 160, "height": 90})
+        if not reply.get("ok"):
+            print(f"Benchmark setup failed: {reply}")
+            return 1
+        block_id = reply["results"][0]["id"]
+        
+        latencies = []
+        start = time.perf_counter()
+        sent = 0
+        while sent < count:
+            n = min(batch_size, count - sent)
+            batch = [{"op": "move", "id": block_id, "x": 100 + (sent + i) % 400, "y": 100}
+                     for i in range(n)]
+            t0 = time.perf_counter()
+            client.send(batch)
+            latencies.append(time.perf_counter() - t0)
+            sent += n
+        elapsed = time.perf_counter() - start
+        
+        client.send({"op": "delete", "id": block_id})
+    finally:
+        client.close()
+    
+    latencies.sort()
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+    
+    print(f"📊 {count} commands in {len(latencies)} batches of {batch_size}: "
+          f"{count / elapsed:.0f} cmd/s, {len(latencies) / elapsed:.0f} batches/s")
+    print(f"   round-trip latency p50 {percentile(0.50):.2f} ms, p95 {percentile(0.95):.2f} ms, "
+          f"p99 {percentile(0.99):.2f} ms, max {latencies[-1] * 1000:.2f} ms")
+    return 0
+
+
+# --- Benchmarks ---
+
+# Must not be loaded by a plain import, see LazyModule
+STARTUP_LAZY_MODULES = ("PIL.Image", "PIL.ImageTk", "PIL.ImageGrab", "PIL.ImageFilter", "PIL.ImageChops",
+                        "concurrent.futures", "tempfile", "ctypes", "win32api", "win32gui")
+
+def run_startup_benchmark(runs=5):
+    """Measure import time and time to first window in fresh interpreters against the budgets.
+    
+    Returns 1 when a budget is exceeded, 2 when the window couldn't be
+    measured at all (e.g. no display) and 0 when everything passed.
+    """
+    script = os.path.abspath(__file__)
+    import_code = ("import sys, time; start = time.perf_counter(); import streamblock; "
+                   "elapsed = time.perf_counter() - start; "
+                   f"print(elapsed, ','.join(m for m in {STARTUP_LAZY_MODULES!r} if m in sys.modules))")
+    
+    import_times, window_times, eager = [], [], set()
+    window_error = None
+    
+    # Fresh directory so no saved layout or settings are loaded with the window
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [os.path.dirname(script),
+                                                                         os.environ.get("PYTHONPATH")])))
+        # The first run of each only warms disk caches and bytecode
+        for i in range(runs + 1):
+            result = subprocess.run([sys.executable, "-c", import_code], cwd=directory, env=env,
+                                    capture_output=True, text=True, timeout=60)
+            if result.returncode != 0:
+                print(f"Import failed: {result.stderr.strip()}")
+                return 1
+            elapsed, modules = (result.stdout.strip().split(" ", 1) + [""])[:2]
+            eager.update(filter(None, modules.split(",")))
+            if i:
+                import_times.append(float(elapsed) * 1000)
+        
+        for i in range(runs + 1):
+            start = time.perf_counter()
+            process = subprocess.Popen([sys.executable, script, "--startup-probe"], cwd=directory, env=env,
+                                       stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+            # Event messages may come first
+            ready = any(line.strip() == "ready" for line in process.stdout)
+            elapsed = (time.perf_counter() - start) * 1000
+            _, stderr = process.communicate(timeout=60)
+            if not ready:
+                window_error = (stderr.strip().splitlines() or ["no window"])[-1]
+                break
+            if i:
+                window_times.append(elapsed)
+    
+    def median(values):
+        return sorted(values)[len(values) // 2]
+    
+    failed = False
+    import_ms = median(import_times)
+    print(f"🚀 Import: median {import_ms:.0f} ms over {runs} runs (budget {Config.STARTUP_IMPORT_BUDGET_MS} ms)")
+    if import_ms > Config.STARTUP_IMPORT_BUDGET_MS:
+        print("   ❌ Import over budget")
+        failed = True
+    if eager:
+        print(f"   ❌ Loaded at import, should be lazy: {', '.join(sorted(eager))}")
+        failed = True
+    
+    if window_error:
+        print(f"   ❌ First window not measured: {window_error}")
+    else:
+        window_ms = median(window_times)
+        print(f"🚀 First window: median {window_ms:.0f} ms from process start "
+              f"(budget {Config.STARTUP_WINDOW_BUDGET_MS} ms)")
+        if window_ms > Config.STARTUP_WINDOW_BUDGET_MS:
+            print("   ❌ First window over budget")
+            failed = True
+    
+    if failed:
+        print("   ❌ Startup budget exceeded")
+        return 1
+    if window_error:
+        print("   ❌ Startup not fully measured")
+        return 2
+    print("   ✅ Within startup budgets")
+    return 0
+
+def run_tracking_benchmark(ticks=300, seed=1):
+    """Track a synthetic element across noisy frames and report search cost per tick.
+    
+    Each tick the element slides (and occasionally jumps) within the search
+    radius and the tracker searches the usual window around the block, seeing
+    the frame without the block like capture_behind does. Fails when more
+    than TRACK_MAX_LOST_RATE of the ticks find no confident match.
+    """
+    rng = random.Random(seed)
+    sw, sh = 1920, 1080
+    w, h = 240, 90
+    r = Config.TRACK_SEARCH_RADIUS
+    
+    # Smoothed noise stands in for video content, the element for a logo/ad
+    background = Image.effect_noise((sw, sh), 60).filter(ImageFilter.GaussianBlur(4)).convert('RGB')
+    element = Image.effect_noise((w, h), 90).filter(ImageFilter.GaussianBlur(2)).convert('RGB')
+    draw = ImageDraw.Draw(element)
+    draw.rectangle((20, 20, w - 20, h - 20), outline=(255, 255, 255), width=6)
+    draw.text((40, 35), "SPONSORED", fill=(255, 220, 0))
+    
+    ex, ey = 600, 400
+    frame = background.copy()
+    frame.paste(element, (ex, ey))
+    tracker = RegionTracker(frame.crop((ex, ey, ex + w, ey + h)))
+    bx, by = ex, ey
+    
+    times = []
+    errors = []
+    lost = 0
+    vx, vy = 6, 3
+    
+    for tick in range(ticks):
+        if rng.random() < 0.05:
+            ex += rng.randint(-r // 2, r // 2)
+            ey += rng.randint(-r // 2, r // 2)
+        else:
+            ex += vx
+            ey += vy
+        if not 100 < ex < sw - w - 100:
+            vx = -vx
+        if not 100 < ey < sh - h - 100:
+            vy = -vy
+        ex = max(0, min(ex, sw - w))
+        ey = max(0, min(ey, sh - h))
+        
+        frame = background.copy()
+        frame.paste(element, (ex, ey))
+        
+        start_time = time.perf_counter()
+        box = (max(0, bx - r), max(0, by - r), min(sw, bx + w + r), min(sh, by + h + r))
+        search = frame.crop(box)
+        start = (bx - box[0], by - box[1])
+        match = tracker.locate(search, start)
+        times.append(time.perf_counter() - start_time)
+        
+        if match:
+            bx, by = box[0] + match[0], box[1] + match[1]
+        else:
+            lost += 1
+        errors.append(abs(bx - ex) + abs(by - ey))
+    
+    times.sort()
+    mean_ms = sum(times) / len(times) * 1000
+    p95_ms = times[int(len(times) * 0.95)] * 1000
+    print(f"🎯 Tracking {ticks} ticks, {w}x{h} template, radius {r}px: "
+          f"mean {mean_ms:.2f} ms, p95 {p95_ms:.2f} ms, max {times[-1] * 1000:.2f} ms per tick")
+    print(f"   position error mean {sum(errors) / len(errors):.1f}px, max {max(errors)}px, "
+          f"{lost} ticks without a confident match")
+    
+    if lost > ticks * Config.TRACK_MAX_LOST_RATE:
+        print(f"   ❌ Lost {lost / ticks:.0%} of ticks (max {Config.TRACK_MAX_LOST_RATE:.0%})")
+        return 1
+    print("   ✅ Tracking held")
+    return 0
+
+def run_effect_benchmark(blocks=3, seconds=5.0, effect="pixelate", size=(320, 180)):
+    """Run effect workers for a few blocks and report the refresh rate they actually reach.
+    
+    On Windows the blocks sit on the real screen and capture with
+    BehindCapture, so the result includes rendering whatever windows are
+    behind them. Elsewhere a scrolling synthetic frame stands in and only the
+    filter and tile path is measured. Fails below EFFECT_MIN_FPS per block.
+    """
+    w, h = size
+    if IS_WINDOWS:
+        sw, sh = get_screen_size()
+        capture = None
+        source = "screen, windows behind rendered with PrintWindow"
+    else:
+        sw, sh = 1920, 1080
+        background = Image.effect_noise((sw + 200, sh), 60).filter(ImageFilter.GaussianBlur(4)).convert('RGB')
+        clock = time.perf_counter()
+        
+        def capture(bbox):
+            # Scroll the content so every frame differs, like video
+            shift = int((time.perf_counter() - clock) * 120) % 200
+            return background.crop((bbox[0] + shift, bbox[1], bbox[2] + shift, bbox[3]))
+        source = "synthetic frames, PrintWindow needs Windows"
+    
+    store = BlockStore()
+    workers = []
+    for i in range(blocks):
+        x = (100 + i * (w + 20)) % max(1, sw - w)
+        block_id = store.add(x, 100, w, h, effect=effect)
+        workers.append(BlockWorker(store, block_id, lambda callback, *args: callback(*args),
+                                   on_tiles=lambda tiles: None, capture=capture))
+    
+    start_time = time.perf_counter()
+    for worker in workers:
+        worker.start_effect()
+    time.sleep(seconds)
+    for worker in workers:
+        worker.stop_effect()
+    elapsed = time.perf_counter() - start_time
+    
+    fps = [worker.frames / elapsed for worker in workers]
+    print(f"✨ Effects: {blocks} {effect} blocks of {w}x{h} for {elapsed:.1f}s ({source})")
+    print(f"   {min(fps):.1f}-{max(fps):.1f} FPS per block (target {Config.EFFECT_FPS}, "
+          f"minimum {Config.EFFECT_MIN_FPS})")
+    if min(fps) < Config.EFFECT_MIN_FPS:
+        print("   ❌ Effect blocks refresh too slowly")
+        return 1
+    print("   ✅ Effect refresh rate held")
+    return 0
+
+def run_model_benchmark(count=5000, seconds=10.0, seed=1):
+    """Drive count modeled blocks through detection and transitions headless.
+    
+    Blocks sit on a jittered grid over a synthetic 4K frame whose colors
+    change every two detection intervals. The scheduler runs on a simulated
+    clock at ANIMATION_FPS and captures crops of that frame. Memory per block
+    is what the store allocates, measured with tracemalloc.
+    """
+    rng = random.Random(seed)
+    sw, sh = 3840, 2160
+    margin = Config.SAMPLE_MARGIN
+    cell = max(Config.MIN_BLOCK_SIZE + 2 * margin, int((sw * sh / count) ** 0.5))
+    cols, rows = max(1, sw // cell), max(1, sh // cell)
+    
+    positions = []
+    for i in range(count):
+        w = rng.randint(Config.MIN_BLOCK_SIZE, cell - margin)
+        h = rng.randint(Config.MIN_BLOCK_SIZE, cell - margin)
+        x = (i % cols) * cell + rng.randint(0, cell - w)
+        y = (i // cols % rows) * cell + rng.randint(0, cell - h)
+        positions.append((x, y, w, h))
+    
+    # Coarse random mosaics stand in for screen content
+    frames = [Image.frombytes('RGB', (64, 36), rng.randbytes(64 * 36 * 3)).resize((sw, sh), Image.NEAREST)
+              for _ in range(2)]
+    frame = frames[0]
+    
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    store = BlockStore()
+    ids = [store.add(x, y, w, h, is_dynamic=True) for x, y, w, h in positions]
+    store_bytes = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    
+    index = SpatialGrid()
+    for block_id, (x, y, w, h) in zip(ids, positions):
+        index.update(block_id, (x, y, x + w, y + h))
+        store.activate(block_id, rng.random() * Config.DETECTION_INTERVAL)
+    scheduler = BlockScheduler(store, capture=lambda bbox: frame.crop(bbox), screen_size=lambda: (sw, sh),
+                               index=index)
+    
+    frame_time = 1 / Config.ANIMATION_FPS
+    ticks = int(seconds / frame_time)
+    detect_times, animate_times = [], []
+    detected = stepped = 0
+    console_level, events.console_level = events.console_level, "warning"
+    start_time = time.perf_counter()
+    try:
+        for tick in range(ticks):
+            now = tick * frame_time
+            frame = frames[int(now / (2 * Config.DETECTION_INTERVAL)) % 2]
+            
+            tick_start = time.perf_counter()
+            detected += scheduler.detect_due(now)[0]
+            detect_end = time.perf_counter()
+            stepped += len(scheduler.animate(now))
+            detect_times.append(detect_end - tick_start)
+            animate_times.append(time.perf_counter() - detect_end)
+    finally:
+        events.console_level = console_level
+    total = time.perf_counter() - start_time
+    
+    save_start = time.perf_counter()
+    json.dumps(store.layout_data(ids))
+    save_ms = (time.perf_counter() - save_start) * 1000
+    
+    tick_ms = [(d + a) * 1000 for d, a in zip(detect_times, animate_times)]
+    budget_ms = frame_time * 1000
+    over = sum(1 for t in tick_ms if t > budget_ms)
+    print(f"🧱 Block model: {count} blocks, {ticks} ticks at {Config.ANIMATION_FPS} FPS "
+          f"({seconds:.0f}s simulated) in {total:.2f}s")
+    print(f"   detection: {detected} block passes, mean {sum(detect_times) / ticks * 1000:.2f} ms, "
+          f"max {max(detect_times) * 1000:.2f} ms per tick ({sum(detect_times) / max(1, detected) * 1e6:.1f} µs per block)")
+    print(f"   transitions: {stepped} block steps, mean {sum(animate_times) / ticks * 1000:.2f} ms, "
+          f"max {max(animate_times) * 1000:.2f} ms per tick ({sum(animate_times) / max(1, stepped) * 1e6:.1f} µs per step)")
+    print(f"   {over} of {ticks} ticks over the {budget_ms:.1f} ms frame budget, layout save {save_ms:.1f} ms")
+    print(f"   memory: {store_bytes / count:.0f} B per block in the store")
+    return 0
+
+
+# --- Detection traces ---
+#
+# A trace is a binary log of what the dynamic-color pipeline saw and
+# decided, written while the app runs (--record-trace) and fed back through
+# the same BlockStore decision, transition and gradient code headless
+# (--replay-trace).
+# After a fixed header, every record starts with (kind, block id, seconds
+# since recording started):
+#
+#   B  block first seen: geometry, current + target colors, gradient flags
+#   D  detection tick: geometry, the 8 sampled colors, transition decision
+#   F  animation frame: elapsed transition time, resulting colors, flags
+#
+# Colors are stored as 8 RGB triplets in SAMPLE_DIRECTIONS order.
+
+TRACE_MAGIC = b"SBTRACE1"
+TRACE_HEADER = struct.Struct("<8sdddd")  # magic, change/gradient thresholds, transition duration, fps
+TRACE_RECORD = struct.Struct("<cId")
+TRACE_BLOCK = struct.Struct("<iiHH24s24sB")
+TRACE_DETECT = struct.Struct("<iiHH24sB")
+TRACE_FRAME = struct.Struct("<d24sB")
+
+# Flag bits
+TRACE_CHANGED = 1  # D: transition started
+TRACE_GRADIENT = 2  # D: new targets use a gradient, B: target_gradient
+TRACE_DONE = 1  # F: transition finished
+TRACE_RENDER_GRADIENT = 2  # F/B: block renders a gradient
+TRACE_SHOULD_GRADIENT = 4  # B: should_gradient
+TRACE_TRANSITIONING = 8  # B: transition running
+
+class TraceRecorder:
+    """Appends detection ticks and animation frames of live blocks to a trace file.
+
+    Called from the scheduler threads with the store lock held, so each record
+    matches the state it describes. Writes go through a buffered file under
+    one lock.
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        self._lock = Lock()
+        self._file = open(path, 'wb')
+        self._file.write(TRACE_HEADER.pack(TRACE_MAGIC, Config.COLOR_CHANGE_THRESHOLD, Config.GRADIENT_THRESHOLD,
+                                           Config.TRANSITION_DURATION, Config.ANIMATION_FPS))
+        self._start = time.perf_counter()
+        self._seen = set()
+        self.records = 0
+
+    def observe(self, store, block_id):
+        """Snapshot a block's state the first time it is seen, call before changing that state"""
+        if block_id in self._seen:
+            return
+        x, y, w, h = store.geometry(block_id) or (0, 0, 1, 1)
+        w, h = max(0, min(w, 0xFFFF)), max(0, min(h, 0xFFFF))
+        flags = ((TRACE_GRADIENT if store.has_flag(block_id, BLOCK_TARGET_GRADIENT) else 0) |
+                 (TRACE_SHOULD_GRADIENT if store.has_flag(block_id, BLOCK_SHOULD_GRADIENT) else 0) |
+                 (TRACE_TRANSITIONING if store.has_flag(block_id, BLOCK_TRANSITIONING) else 0))
+        body = TRACE_BLOCK.pack(x, y, w, h, colors_to_bytes(store.color_values(block_id)),
+                                colors_to_bytes(store.color_values(block_id, "target")), flags)
+        with self._lock:
+            self._seen.add(block_id)
+            self._write(b"B", block_id, body)
+
+    def _write(self, kind, block_id, body):
+        if self._file is None:
+            return
+        self._file.write(TRACE_RECORD.pack(kind, block_id, time.perf_counter() - self._start))
+        self._file.write(body)
+        self.records += 1
+
+    def detection(self, store, block_id, geometry, gradient):
+        """A detection tick, gradient is the decision (None when no transition started)"""
+        x, y, w, h = geometry
+        flags = 0 if gradient is None else TRACE_CHANGED | (TRACE_GRADIENT if gradient else 0)
+        samples = colors_to_bytes(store.color_values(block_id, "sampled"))
+        body = TRACE_DETECT.pack(x, y, min(w, 0xFFFF), min(h, 0xFFFF), samples, flags)
+        with self._lock:
+            self._write(b"D", block_id, body)
+
+    def frame(self, store, block_id, elapsed, done):
+        """An animation step, recorded after the block state was updated"""
+        flags = (TRACE_DONE if done else 0) | (TRACE_RENDER_GRADIENT if store.renders_gradient(block_id) else 0)
+        body = TRACE_FRAME.pack(elapsed, colors_to_bytes(store.color_values(block_id)), flags)
+        with self._lock:
+            self._write(b"F", block_id, body)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+# Set by --record-trace, read by the scheduler threads
+trace_recorder = None
+
+def read_trace(path):
+    """Header values and a generator of (kind, block id, time, fields) records"""
+    f = open(path, 'rb')
+    header = f.read(TRACE_HEADER.size)
+    if len(header) < TRACE_HEADER.size or header[:8] != TRACE_MAGIC:
+        f.close()
+        raise ValueError(f"{path} is not a StreamBlock trace")
+    _, change_threshold, gradient_threshold, duration, fps = TRACE_HEADER.unpack(header)
+    settings = {'COLOR_CHANGE_THRESHOLD': change_threshold, 'GRADIENT_THRESHOLD': gradient_threshold,
+                'TRANSITION_DURATION': duration, 'ANIMATION_FPS': fps}
+    bodies = {b"B": TRACE_BLOCK, b"D": TRACE_DETECT, b"F": TRACE_FRAME}
+    
+    def records():
+        with f:
+            while True:
+                prefix = f.read(TRACE_RECORD.size)
+                if len(prefix) < TRACE_RECORD.size:
+                    return
+                kind, block_id, t = TRACE_RECORD.unpack(prefix)
+                body = bodies.get(kind)
+                if body is None:
+                    raise ValueError(f"Corrupt trace record {kind!r}")
+                data = f.read(body.size)
+                if len(data) < body.size:
+                    return  # recording was cut off mid-record
+                yield kind, block_id, t, body.unpack(data)
+    
+    return settings, records()
+
+def run_trace_replay(path, render=True, max_reported=10):
+    """Feed a trace through a BlockStore's decision, transition and render code and report divergences"""
+    settings, records = read_trace(path)
+    saved = {key: getattr(Config, key) for key in settings}
+    for key, value in settings.items():
+        setattr(Config, key, value)
+    
+    store = BlockStore()
+    blocks = {}  # recorded block id -> store id
+    directions = list(SAMPLE_DIRECTIONS)
+    counts = {b"B": 0, b"D": 0, b"F": 0}
+    divergences = []
+    rendered = 0
+    first_time = last_time = None
+    
+    def diverged(kind, block_id, t, what, recorded, replayed):
+        divergences.append((kind.decode(), block_id, t, what, recorded, replayed))
+    
+    start_time = time.perf_counter()
+    try:
+        for kind, block_id, t, fields in records:
+            counts[kind] += 1
+            first_time = t if first_time is None else first_time
+            last_time = t
+            
+            if kind == b"B":
+                x, y, w, h, current, target, flags = fields
+                block = blocks[block_id] = store.add(x, y, w, h, is_dynamic=True)
+                store.set_color_values(block, colors_from_bytes(current), colors_from_bytes(target))
+                store.set_flag(block, BLOCK_TARGET_GRADIENT, bool(flags & TRACE_GRADIENT))
+                store.set_flag(block, BLOCK_SHOULD_GRADIENT, bool(flags & TRACE_SHOULD_GRADIENT))
+                store.set_flag(block, BLOCK_TRANSITIONING, bool(flags & TRACE_TRANSITIONING))
+                continue
+            
+            block = blocks.get(block_id)
+            if block is None:
+                diverged(kind, block_id, t, "record before block", "B", "missing")
+                continue
+            
+            if kind == b"D":
+                x, y, w, h, samples, flags = fields
+                samples = colors_from_bytes(samples)
+                store.set_geometry(block, x, y, w, h)
+                target = store.color_values(block, "target")
+                target_gradient = store.has_flag(block, BLOCK_TARGET_GRADIENT)
+                gradient = store.decide(block, samples, t)
+                recorded = None if not flags & TRACE_CHANGED else bool(flags & TRACE_GRADIENT)
+                if gradient != recorded:
+                    diverged(kind, block_id, t, "transition", recorded, gradient)
+                    # Follow the recording so each divergence is reported where it starts
+                    if recorded is not None:
+                        target, target_gradient = samples, recorded
+                    store.set_color_values(block, target=target)
+                    store.set_flag(block, BLOCK_TARGET_GRADIENT, target_gradient)
+            
+            else:
+                elapsed, colors, flags = fields
+                colors = colors_from_bytes(colors)
+                done = store.advance(block, elapsed)
+                current = store.color_values(block)
+                render_gradient = store.renders_gradient(block)
+                
+                if current != colors:
+                    changed = [i for i in range(8) if current[i] != colors[i]]
+                    diverged(kind, block_id, t, f"colors ({', '.join(directions[i] for i in changed)})",
+                             [int_to_color(colors[i]) for i in changed], [int_to_color(current[i]) for i in changed])
+                    store.set_color_values(block, current=colors)
+                if done != bool(flags & TRACE_DONE):
+                    diverged(kind, block_id, t, "done", bool(flags & TRACE_DONE), done)
+                if render_gradient != bool(flags & TRACE_RENDER_GRADIENT):
+                    diverged(kind, block_id, t, "gradient", bool(flags & TRACE_RENDER_GRADIENT), render_gradient)
+                
+                if render and flags & TRACE_RENDER_GRADIENT:
+                    _, _, w, h = store.geometry(block)
+                    create_advanced_gradient(w, h, store.colors(block))
+                    rendered += 1
+    finally:
+        for key, value in saved.items():
+            setattr(Config, key, value)
+    
+    elapsed = time.perf_counter() - start_time
+    total = sum(counts.values())
+    span = (last_time - first_time) if total else 0.0
+    
+    print(f"🔁 Replayed {total} records ({len(blocks)} blocks, {counts[b'D']} detections, "
+          f"{counts[b'F']} frames, {rendered} gradients rendered) in {elapsed * 1000:.0f} ms")
+    if elapsed > 0 and total:
+        speedup = f", {span / elapsed:.1f}x real time" if span > 0 else ""
+        print(f"   {total / elapsed:.0f} records/s, {counts[b'D'] / elapsed:.0f} detections/s, "
+              f"{counts[b'F'] / elapsed:.0f} frames/s{speedup}")
+    
+    if not divergences:
+        print("   ✅ No divergence from the recorded decisions")
+        return 0
+    
+    print(f"   ❌ {len(divergences)} divergences, first {min(len(divergences), max_reported)}:")
+    for kind, block_id, t, what, recorded, replayed in divergences[:max_reported]:
+        print(f"      {t:9.3f}s block {block_id} {kind} {what}: recorded {recorded}, replayed {replayed}")
+    return 1
+
+# --- Offline redaction ---
+
+def parse_size(value):
+    """Parse a WIDTHxHEIGHT argument"""
+    try:
+        w, h = value.lower().split("x")
+        w, h = int(w), int(h)
+        if w <= 0 or h <= 0:
+            raise ValueError
+        return w, h
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT, got {value!r}")
+
+def scale_specs(specs, from_size, to_size):
+    """Map block specs from the screen they were laid out on to a frame size"""
+    if not from_size or from_size == to_size:
+        return specs
+    sx = to_size[0] / from_size[0]
+    sy = to_size[1] / from_size[1]
+    return [(round(x * sx), round(y * sy), max(1, round(w * sx)), max(1, round(h * sy)), color, is_dynamic, effect)
+            for x, y, w, h, color, is_dynamic, effect in specs]
+
+def redact_frame(image, specs):
+    """Paint layout blocks onto an RGB frame the way the live overlay would.
+    
+    Static blocks are filled with their color. Dynamic blocks sample the
+    same 8 points as the live detection loop, but from the frame itself, and
+    become a solid color or an adaptive gradient. Effect blocks pixelate or
+    blur the region they cover.
+    """
+    fw, fh = image.size
+    
+    # Sample every block before painting so blocks don't sample each other
+    fills = []
+    for x, y, w, h, color, is_dynamic, effect in specs:
+        x1, y1 = max(0, x), max(0, y)
+        x2, y2 = min(fw, x + w), min(fh, y + h)
+        if x2 <= x1 or y2 <= y1:
+            continue
+        
+        if effect:
+            region = image.crop((x1, y1, x2, y2))
+            small = effect_reduce(region, effect, effect_downscale(effect))
+            fills.append(((x1, y1, x2, y2), effect_expand(small, effect, region.size), None))
+            continue
+        
+        if not is_dynamic:
+            fills.append(((x1, y1, x2, y2), hex_to_rgb(color), None))
+            continue
+        
+        colors = {}
+        for direction, (sx1, sy1, sx2, sy2) in compute_sample_areas(x, y, w, h, fw, fh).items():
+            if sx2 - sx1 < 8 or sy2 - sy1 < 8:
+                colors[direction] = '#808080'
+            else:
+                colors[direction] = analyze_single_pixel_area(image.crop((sx1, sy1, sx2, sy2)))
+        fills.append(((x1, y1, x2, y2), hex_to_rgb(colors['top']), colors if should_use_gradient(colors) else None))
+    
+    for box, rgb, gradient_colors in fills:
+        if isinstance(rgb, Image.Image):
+            image.paste(rgb, box[:2])
+        elif gradient_colors:
+            image.paste(create_advanced_gradient(box[2] - box[0], box[3] - box[1], gradient_colors), box[:2])
+        else:
+            image.paste(rgb, box)
+    return image
+
+_redaction_specs = None
+_redaction_layout_size = None
+
+def _init_redaction_worker(specs, layout_size, settings):
+    global _redaction_specs, _redaction_layout_size
+    # stdout may be the frame sink, keep diagnostics off it
+    sys.stdout = sys.stderr
+    # Spawned workers re-import the module, carry over the active profile
+    for key, value in settings.items():
+        setattr(Config, key, value)
+    _redaction_specs = specs
+    _redaction_layout_size = layout_size
+
+def _frame_specs(frame_size):
+    return scale_specs(_redaction_specs, _redaction_layout_size, frame_size)
+
+def _redact_image_file(input_path, output_path):
+    """Worker task: redact one image file"""
+    with Image.open(input_path) as image:
+        frame = image.convert('RGB')
+    redact_frame(frame, _frame_specs(frame.size)).save(output_path)
+    return output_path
+
+def _redact_raw_frame(data, size):
+    """Worker task: redact one packed RGB24 frame"""
+    frame = Image.frombytes('RGB', size, data)
+    return redact_frame(frame, _frame_specs(size)).tobytes()
+
+def _iter_raw_frames(stream, frame_bytes):
+    while True:
+        data = stream.read(frame_bytes)
+        if not data:
+            return
+        if len(data) < frame_bytes:
+            # Pipes may return short reads, keep reading until a full frame
+            chunks = [data]
+            got = len(data)
+            while got < frame_bytes:
+                chunk = stream.read(frame_bytes - got)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                got += len(chunk)
+            if got < frame_bytes:
+                print(f"Dropping truncated final frame ({got} of {frame_bytes} bytes)", file=sys.stderr)
+                return
+            data = b"".join(chunks)
+        yield data
+
+def run_redaction(input_path, output_path, layout_file, raw_size=None, layout_size=None, workers=None):
+    """Redact a frame sequence with a saved layout using a bounded process pipeline.
+    
+    input_path is an image directory, or '-' / a file of raw RGB24 frames
+    when raw_size is given (e.g. ffmpeg -f rawvideo -pix_fmt rgb24). At most
+    REDACT_QUEUE_PER_WORKER frames per worker are in flight and results are
+    written in input order.
+    """
+    with open(layout_file, 'r') as f:
+        layout_data = json.load(f)
+    if not isinstance(layout_data, list):
+        raise ValueError("Invalid layout file format")
+    specs = parse_layout_specs(layout_data)
+    
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = workers * Config.REDACT_QUEUE_PER_WORKER
+    
+    if raw_size:
+        source = sys.stdin.buffer if input_path == '-' else open(input_path, 'rb')
+        stdout = sys.__stdout__.buffer
+        sink = stdout if output_path == '-' else open(output_path, 'wb')
+        if sink is stdout:
+            sys.stdout = sys.stderr
+        frame_bytes = raw_size[0] * raw_size[1] * 3
+        tasks = ((_redact_raw_frame, data, raw_size) for data in _iter_raw_frames(source, frame_bytes))
+        write = sink.write
+    else:
+        if not os.path.isdir(input_path):
+            raise ValueError(f"{input_path} is not a directory (use --raw-size for raw frames)")
+        os.makedirs(output_path, exist_ok=True)
+        names = sorted(name for name in os.listdir(input_path)
+                       if name.lower().endswith(Config.REDACT_IMAGE_EXTENSIONS))
+        tasks = ((_redact_image_file, os.path.join(input_path, name), os.path.join(output_path, name))
+                 for name in names)
+        source = sink = None
+        write = None
+    
+    start = time.perf_counter()
+    frames = 0
+    in_flight = deque()
+    
+    try:
+        with futures.ProcessPoolExecutor(max_workers=workers, initializer=_init_redaction_worker,
+                                         initargs=(specs, layout_size,
+                                                   {key: getattr(Config, key) for key in TUNABLE_SETTINGS})) as pool:
+            for task in tasks:
+                if len(in_flight) >= max_in_flight:
+                    result = in_flight.popleft().result()
+                    if write:
+                        write(result)
+                    frames += 1
+                in_flight.append(pool.submit(*task))
+            
+            while in_flight:
+                result = in_flight.popleft().result()
+                if write:
+                    write(result)
+                frames += 1
+    finally:
+        if sink is not None and sink is not sys.__stdout__.buffer:
+            sink.close()
+        elif sink is not None:
+            sink.flush()
+        if source is not None and source is not sys.stdin.buffer:
+            source.close()
+    
+    elapsed = time.perf_counter() - start
+    fps = frames / elapsed if elapsed > 0 else 0.0
+    print(f"🎬 Redacted {frames} frames with {len(specs)} blocks in {elapsed:.1f} s "
+          f"({fps:.1f} fps, {workers} workers)", file=sys.stderr)
+    return frames
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="StreamBlock overlay blocks")
+    parser.add_argument("--ipc", action="store_true",
+                        help="start the local control server")
+    parser.add_argument("--ipc-host", default=Config.IPC_HOST)
+    parser.add_argument("--ipc-port", type=int, default=Config.IPC_PORT)
+    parser.add_argument("--ipc-send", metavar="JSON",
+                        help="send a command (or list of commands) to a running app and print the reply")
+    parser.add_argument("--ipc-bench", type=int, metavar="COUNT",
+                        help="benchmark a running app's control server with COUNT move commands")
+    parser.add_argument("--ipc-batch", type=int, default=1,
+                        help="commands per message for --ipc-bench")
+    parser.add_argument("--redact", metavar="INPUT",
+                        help="headless: redact an image directory, or raw RGB24 frames ('-' for stdin) with --raw-size")
+    parser.add_argument("--output", metavar="OUTPUT",
+                        help="output directory for images, or file ('-' for stdout) for raw frames")
+    parser.add_argument("--layout", default=Config.CONFIG_FILE,
+                        help="layout file applied by --redact")
+    parser.add_argument("--raw-size", type=parse_size, metavar="WxH",
+                        help="frame size of raw RGB24 input")
+    parser.add_argument("--layout-size", type=parse_size, metavar="WxH",
+                        help="screen size the layout was made on, blocks are scaled to the frame size")
+    parser.add_argument("--workers", type=int,
+                        help="worker processes for --redact (default: all cores)")
+    parser.add_argument("--benchmark-tracking", action="store_true",
+                        help="measure region tracking cost on synthetic frames")
+    parser.add_argument("--benchmark-effects", action="store_true",
+                        help="measure the refresh rate pixelate/blur blocks actually reach")
+    parser.add_argument("--benchmark-model", type=int, metavar="COUNT", nargs="?", const=5000,
+                        help="headless: run COUNT modeled blocks (default 5000) through detection and transitions")
+    parser.add_argument("--benchmark-startup", action="store_true",
+                        help="measure import time and time to first window against the startup budgets")
+    parser.add_argument("--startup-probe", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--profile",
+                        help="performance profile (eco, balanced, realtime or one from the settings file)")
+    parser.add_argument("--settings", default=Config.SETTINGS_FILE,
+                        help="settings file with profile overrides, watched for changes")
+    parser.add_argument("--record-trace", metavar="FILE",
+                        help="record detection ticks and transitions of dynamic blocks to FILE")
+    parser.add_argument("--replay-trace", metavar="FILE",
+                        help="headless: replay a recorded trace, report throughput and divergences")
+    parser.add_argument("--replay-no-render", action="store_true",
+                        help="skip gradient rendering in --replay-trace")
+    parser.add_argument("--log-level", choices=list(EventLog.LEVELS), default=Config.EVENT_CONSOLE_LEVEL,
+                        help="lowest event level written to the console")
+    parser.add_argument("--event-log", metavar="FILE",
+                        help="also append events to FILE as JSON lines")
+    args = parser.parse_args(argv)
+    
+    events.console_level = args.log_level
+    events.log_file = args.event_log
+    
+    if args.redact and args.output == '-':
+        # Raw frames go to stdout, keep messages off it
+        sys.stdout = sys.stderr
+    
+    profiles = ProfileManager(args.settings, args.profile)
+    profiles.load()
+    
+    if args.replay_trace:
+        try:
+            return run_trace_replay(args.replay_trace, render=not args.replay_no_render)
+        except (OSError, ValueError) as e:
+            print(f"Replay failed: {e}", file=sys.stderr)
+            return 1
+    
+    if args.benchmark_startup:
+        return run_startup_benchmark()
+    
+    if args.startup_probe:
+        # Child of --benchmark-startup: report once the window is on screen
+        app = OverlayApp(profiles)
+        app.wait_visibility(app)
+        print("ready", flush=True)
+        app.destroy()
+        return 0
+    
+    if args.benchmark_model:
+        return run_model_benchmark(args.benchmark_model)
+    
+    if args.benchmark_tracking:
+        return run_tracking_benchmark()
+    
+    if args.benchmark_effects:
+        return run_effect_benchmark()
+    
+    if args.redact:
+        if not args.output:
+            parser.error("--redact requires --output")
+        try:
+            run_redaction(args.redact, args.output, args.layout, args.raw_size, args.layout_size, args.workers)
+        except (OSError, ValueError) as e:
+            print(f"Redaction failed: {e}", file=sys.stderr)
+            return 1
+        return 0
+    
+    if args.ipc_send or args.ipc_bench:
+        try:
+            if args.ipc_bench:
+                return run_ipc_benchmark(args.ipc_host, args.ipc_port, args.ipc_bench, max(1, args.ipc_batch))
+            client = ControlClient(args.ipc_host, args.ipc_port)
+            try:
+                print(json.dumps(client.send(json.loads(args.ipc_send))))
+            finally:
+                client.close()
+        except (OSError, ValueError) as e:
+            print(f"Control server error: {e}", file=sys.stderr)
+            return 1
+        return 0
+    
+    global trace_recorder
+    if args.record_trace:
+        trace_recorder = TraceRecorder(args.record_trace)
+        events.info("trace.start", f"⏺ Recording detection trace to {args.record_trace}")
+    
+    app = OverlayApp(profiles)
+    if args.ipc:
+        app.start_control_server(args.ipc_host, args.ipc_port)
+    try:
+        app.mainloop()
+    finally:
+        if trace_recorder is not None:
+            recorder, trace_recorder = trace_recorder, None
+            recorder.close()
+            events.info("trace.stop", f"⏺ Recorded {recorder.records} trace records to {recorder.path}")
+    return 0
 
 
 if __name__ == "__main__":
-    app = OverlayApp()
-    app.mainloop()
+    status = main()
+    events.flush()
+    sys.exit(status)
 
@@ -0,0 +1,238 @@
+"""Headless tests for the block model, spatial index, event log and traces.
+
+Nothing here opens a window, so the suite runs without a display.
+"""
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import streamblock
+from streamblock import (BLOCK_ACTIVE, BLOCK_SHOULD_GRADIENT, BLOCK_TARGET_GRADIENT, BLOCK_TRANSITIONING,
+                         BlockScheduler, BlockStore, Config, DragController, EventLog, ProfileManager,
+                         SpatialGrid, TraceRecorder, relocate_sample_area, run_trace_replay)
+
+BLACK = [0x000000] * 8
+WHITE = [0xF0F0F0] * 8
+SPLIT = [0x000000] * 4 + [0xF0F0F0] * 4
+
+
+class BlockStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.store = BlockStore()
+        self.block = self.store.add(100, 100, 50, 40, is_dynamic=True)
+        self.store.activate(self.block, 0.0)
+
+    def test_decide_starts_transition_past_threshold(self):
+        gradient = self.store.decide(self.block, WHITE, now=10.0)
+        self.assertIs(gradient, False)
+        self.assertTrue(self.store.has_flag(self.block, BLOCK_TRANSITIONING))
+        self.assertEqual(self.store.color_values(self.block, "target"), WHITE)
+        self.assertEqual(self.store.next_detect[0], 10.0 + Config.DETECTION_INTERVAL)
+
+    def test_decide_ignores_changes_below_threshold(self):
+        self.store.decide(self.block, WHITE, now=10.0)
+        self.store.step_transitions(10.0 + Config.TRANSITION_DURATION)
+        nearly_white = [0xF0F0F0 - 0x010101] * 8
+        self.assertIsNone(self.store.decide(self.block, nearly_white, now=20.0))
+        self.assertEqual(self.store.color_values(self.block, "target"), WHITE)
+
+    def test_decide_keeps_target_for_skipped_directions(self):
+        self.store.decide(self.block, WHITE, now=10.0)
+        self.store.decide(self.block, [None] * 4 + BLACK[:4], now=20.0)
+        self.assertEqual(self.store.color_values(self.block, "target"), SPLIT[4:] + SPLIT[:4])
+
+    def test_decide_flags_gradient_for_contrasting_samples(self):
+        self.assertIs(self.store.decide(self.block, SPLIT, now=10.0), True)
+        self.assertTrue(self.store.has_flag(self.block, BLOCK_TARGET_GRADIENT))
+
+    def test_step_transitions_interpolates_then_finishes(self):
+        self.store.decide(self.block, SPLIT, now=10.0)
+
+        self.assertEqual(self.store.step_transitions(10.0 + Config.TRANSITION_DURATION / 2), [self.block])
+        halfway = self.store.color_values(self.block)
+        self.assertNotEqual(halfway, SPLIT)
+        self.assertTrue(self.store.has_flag(self.block, BLOCK_TRANSITIONING))
+
+        self.store.step_transitions(10.0 + Config.TRANSITION_DURATION)
+        self.assertEqual(self.store.color_values(self.block), SPLIT)
+        self.assertFalse(self.store.has_flag(self.block, BLOCK_TRANSITIONING))
+        self.assertTrue(self.store.has_flag(self.block, BLOCK_SHOULD_GRADIENT))
+        self.assertEqual(self.store.step_transitions(20.0), [])
+
+    def test_suspended_blocks_are_not_due_or_stepped(self):
+        self.store.decide(self.block, WHITE, now=10.0)
+        self.assertFalse(self.store.set_suspended(self.block, 'hidden', True))
+        self.assertFalse(self.store.set_suspended(self.block, 'paused', True))
+        self.assertEqual(self.store.due(100.0)[0], [])
+        self.assertEqual(self.store.step_transitions(10.5), [])
+
+        self.assertFalse(self.store.set_suspended(self.block, 'hidden', False))
+        self.assertTrue(self.store.is_suspended(self.block))
+        self.assertTrue(self.store.set_suspended(self.block, 'paused', False))
+        self.assertEqual([due[0] for due in self.store.due(10.5)[0]], [self.block])
+
+    def test_removed_slot_is_reused_clean(self):
+        self.store.set_suspended(self.block, 'hidden', True)
+        self.store.remove(self.block)
+        block = self.store.add(0, 0, 30, 30, "#ff0000")
+        self.assertNotEqual(block, self.block)
+        self.assertFalse(self.store.is_suspended(block))
+        self.assertFalse(self.store.has_flag(block, BLOCK_ACTIVE))
+        self.assertEqual(self.store.spec(block), (0, 0, 30, 30, "#ff0000", False, None))
+        self.assertIsNone(self.store.decide(self.block, WHITE))
+
+
+class SpatialGridTest(unittest.TestCase):
+    def setUp(self):
+        self.grid = SpatialGrid(cell_size=64)
+        self.grid.update("a", (0, 0, 100, 100))
+        self.grid.update("b", (200, 0, 300, 100))
+
+    def test_query_finds_overlaps_across_cells(self):
+        self.assertEqual(sorted(key for key, _ in self.grid.query((50, 50, 250, 60))), ["a", "b"])
+        self.assertEqual(self.grid.query((100, 0, 200, 100)), [])
+        self.assertEqual(self.grid.query((0, 0, 10, 10), exclude="a"), [])
+
+    def test_update_moves_and_remove_forgets(self):
+        self.grid.update("a", (500, 500, 550, 550))
+        self.assertEqual(self.grid.query((0, 0, 100, 100)), [])
+        self.assertEqual(self.grid.query((510, 510, 520, 520)), [("a", (500, 500, 550, 550))])
+        self.grid.remove("a")
+        self.assertEqual(len(self.grid), 1)
+        self.assertIsNone(self.grid.rect("a"))
+
+    def test_neighbors_and_snap(self):
+        self.assertEqual(self.grid.neighbors("a", 120), ["b"])
+        self.assertEqual(self.grid.neighbors("a", 50), [])
+        # A 50px wide box 4px right of "a" snaps flush against it
+        self.assertEqual(self.grid.snap((104, 30, 154, 60), 8), (100, 30))
+        self.assertEqual(self.grid.snap((130, 30, 160, 60), 8), (130, 30))
+
+
+class RelocateSampleAreaTest(unittest.TestCase):
+    def setUp(self):
+        self.grid = SpatialGrid()
+        self.grid.update("cover", (90, 90, 120, 120))
+
+    def test_uncovered_area_stays(self):
+        self.assertEqual(relocate_sample_area((10, 10, 20, 20), "top_left", self.grid, 1920, 1080),
+                         (10, 10, 20, 20))
+
+    def test_covered_area_moves_outward(self):
+        self.assertEqual(relocate_sample_area((100, 100, 110, 110), "right", self.grid, 1920, 1080),
+                         (120, 100, 130, 110))
+        self.assertEqual(relocate_sample_area((100, 100, 110, 110), "top", self.grid, 1920, 1080),
+                         (100, 80, 110, 90))
+
+    def test_fourth_shift_can_clear_the_box(self):
+        grid = SpatialGrid()
+        for i in range(4):
+            grid.update(i, (100 + 10 * i, 90, 110 + 10 * i, 120))
+        self.assertEqual(relocate_sample_area((100, 100, 108, 108), "right", grid, 1920, 1080),
+                         (140, 100, 148, 108))
+        grid.update(4, (140, 90, 150, 120))
+        self.assertIsNone(relocate_sample_area((100, 100, 108, 108), "right", grid, 1920, 1080))
+
+    def test_gives_up_past_screen_or_limit(self):
+        self.grid.update("edge", (0, 0, 40, 40))
+        self.assertIsNone(relocate_sample_area((10, 10, 20, 20), "top_left", self.grid, 1920, 1080))
+        self.grid.update("wide", (200, 200, 200 + 2 * Config.SAMPLE_RELOCATE_MAX, 220))
+        self.assertIsNone(relocate_sample_area((210, 205, 220, 215), "right", self.grid, 1920, 1080))
+
+    def test_exclude_ignores_own_block(self):
+        self.assertEqual(relocate_sample_area((100, 100, 110, 110), "left", self.grid, 1920, 1080,
+                                              exclude="cover"), (100, 100, 110, 110))
+
+
+class EventLogTest(unittest.TestCase):
+    def setUp(self):
+        self.log = EventLog()
+        self.log.console_level = "error"
+        self.clock = mock.patch.object(streamblock.time, "time", return_value=1000.0)
+        self.now = self.clock.start()
+        self.addCleanup(self.clock.stop)
+        self.addCleanup(self.log.flush)
+
+    def test_repeats_are_counted_and_reported_later(self):
+        for i in range(Config.EVENT_RATE_LIMIT + 3):
+            self.log.info("detect.adapt", f"event {i}")
+        self.log.info("other", "not limited")
+        self.assertEqual(len(self.log.recent()), Config.EVENT_RATE_LIMIT + 1)
+
+        self.now.return_value = 1000.0 + Config.EVENT_RATE_WINDOW
+        self.log.info("detect.adapt", "after the window")
+        last = self.log.recent()[-1]
+        self.assertEqual(last['suppressed'], 3)
+        self.assertEqual(EventLog.format(last), "after the window (3 similar suppressed)")
+
+    def test_recent_filters_by_level_and_sequence(self):
+        self.log.debug("a", "debug")
+        self.log.error("b", "error")
+        self.assertEqual([event['key'] for event in self.log.recent(min_level="warning")], ["b"])
+        first = self.log.recent()[0]['seq']
+        self.assertEqual([event['key'] for event in self.log.recent(after_seq=first)], ["b"])
+
+
+class DragControllerTest(unittest.TestCase):
+    def test_only_the_dragged_block_sees_its_drag(self):
+        drag = DragController()
+        drag.begin("a", "move", 5, 6)
+        self.assertEqual(drag.action_of("a"), "move")
+        self.assertIsNone(drag.action_of("b"))
+        self.assertIsNone(drag.end("b"))
+        self.assertTrue(drag.is_dragging("a"))
+        self.assertEqual(drag.end("a"), "move")
+        self.assertFalse(drag.is_dragging("a"))
+
+
+class ProfileManagerTest(unittest.TestCase):
+    def test_validate_drops_non_finite_values_and_clamps_the_rest(self):
+        with mock.patch.object(streamblock.events, "warning") as warning:
+            valid = ProfileManager()._validate({
+                'DETECTION_INTERVAL': float("inf"), 'TRANSITION_DURATION': float("nan"),
+                'TRACK_INTERVAL': 0.001, 'EFFECT_FPS': "30",
+            })
+        self.assertEqual(valid, {'TRACK_INTERVAL': 0.02, 'EFFECT_FPS': 30})
+        self.assertEqual(warning.call_count, 2)
+
+
+class TraceRoundTripTest(unittest.TestCase):
+    def test_recorded_session_replays_without_divergence(self):
+        from PIL import Image
+
+        frames = [Image.new('RGB', (400, 300), color) for color in ((20, 20, 20), (240, 240, 240))]
+        split = Image.new('RGB', (400, 300), (20, 20, 20))
+        split.paste((240, 240, 240), (0, 150, 400, 300))
+        frames.append(split)
+        frame = frames[0]
+
+        store = BlockStore()
+        blocks = [store.add(50 + 120 * i, 100, 60, 60, is_dynamic=True) for i in range(3)]
+        for block in blocks:
+            store.activate(block, 0.0)
+        scheduler = BlockScheduler(store, capture=lambda bbox: frame.crop(bbox), screen_size=lambda: (400, 300))
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "session.sbt")
+            recorder = TraceRecorder(path)
+            with mock.patch.object(streamblock, "trace_recorder", recorder):
+                now = 0.0
+                for frame in frames:
+                    scheduler.detect_due(now)
+                    for _ in range(int(Config.DETECTION_INTERVAL * 10)):
+                        now += 0.1
+                        scheduler.animate(now)
+                    now += Config.DETECTION_INTERVAL
+            recorder.close()
+            self.assertGreater(recorder.records, 3 * len(frames))
+
+            with mock.patch("sys.stdout"):
+                self.assertEqual(run_trace_replay(path, render=False), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()